@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from projsim.simulation import (
+    FactorCache, as_player_registry, build_simulation_model, create_correlation_matrix, default_batch_size,
+    generate_correlated_projections, generate_projection, get_payout, prepare_draft_results, projections,
+    simulate_team_outcomes,
+)
+
+BUNDLED_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'draft_results_with_team_stacking_and_positions (3).csv')
+
+# Function to time one call with memory tracing off, then repeat it in a separate traced pass to record the peak
+# memory it allocates above what was traced when it started. Tracing slows allocation-heavy code severalfold, so
+# the timed pass never runs under it
+def measure(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return result, {'seconds': seconds, 'peak_mb': peak / 2 ** 20}
+
+# Function to time repeats calls of a cheap per-roster function, cycling through the argument tuples of
+# roster_args, returns the per-call timing
+def measure_repeated(func, repeats, roster_args):
+    def repeat():
+        for i in range(repeats):
+            func(*roster_args[i % len(roster_args)])
+    _, timing = measure(repeat)
+    return {'seconds': timing['seconds'] / repeats, 'peak_mb': timing['peak_mb'], 'repeats': repeats, 'rosters': len(roster_args)}
+
+# Function to time the numba kernels' first call (compile plus run) separately from a warm call
+def measure_jit_warmup():
+    timings = {}
+    for name, func, args in (('get_payout', get_payout, (1,)), ('generate_projection', generate_projection, (20.0, 5.0))):
+        start = time.perf_counter()
+        func(*args)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        func(*args)
+        timings[name] = {'first_call_seconds': first, 'warm_call_seconds': time.perf_counter() - start}
+    return timings
+
+# Function to build a synthetic draft field of num_teams rosters in the bundled CSV's format, six distinct players
+# per team drawn uniformly from the players (with their positions and NFL teams) found in the bundled CSV
+def synthetic_field(num_teams, bundled_df, seed=0):
+    pool = {}
+    for i in range(1, 7):
+        for name, position, team in bundled_df[[f'Player_{i}_Name', f'Player_{i}_Position', f'Player_{i}_Team']].itertuples(index=False):
+            pool[name] = (position, team)
+    names = np.array(list(pool))
+    positions = np.array([pool[name][0] for name in names])
+    nfl_teams = np.array([pool[name][1] for name in names])
+
+    rng = np.random.default_rng(seed)
+    picks = np.argsort(rng.random((num_teams, len(names))), axis=1)[:, :6]
+    columns = {'Simulation': np.arange(num_teams) // 6 + 1, 'Team': [f'Team {i}' for i in range(1, num_teams + 1)]}
+    for i in range(6):
+        columns[f'Player_{i + 1}_Name'] = names[picks[:, i]]
+        columns[f'Player_{i + 1}_Position'] = positions[picks[:, i]]
+        columns[f'Player_{i + 1}_Team'] = nfl_teams[picks[:, i]]
+    return pd.DataFrame(columns)
+
+# Function to benchmark every pipeline stage on one field, returns one record per stage
+def benchmark_field(field_name, draft_results_df, registry, num_simulations, correlations, workers, batch_size=None, micro_repeats=1000):
+    num_teams = draft_results_df['Team'].nunique()
+    batch_size = batch_size or default_batch_size(num_teams)
+    base = {'field': field_name, 'teams': num_teams}
+    records = []
+
+    draft_results, timing = measure(prepare_draft_results, draft_results_df, registry)
+    records.append({**base, 'stage': 'prepare_draft_results', **timing})
+
+    # Per-roster micro benchmarks of the original building blocks, averaged over micro_repeats calls that cycle
+    # through the first micro_repeats rosters
+    rosters = np.arange(min(micro_repeats, num_teams))
+    names = registry.names[draft_results.player_ids[rosters]]
+    positions = draft_results.position_names[draft_results.position_ids[rosters]]
+    nfl_teams = draft_results.nfl_team_names[draft_results.nfl_team_ids[rosters]]
+    projection_lookup = {name: (registry.proj[i], registry.projsd[i]) for i, name in enumerate(registry.names)}
+    timing = measure_repeated(create_correlation_matrix, micro_repeats, list(zip(nfl_teams, positions)))
+    records.append({**base, 'stage': 'create_correlation_matrix', **timing})
+    roster_args = [(names[i], positions[i], nfl_teams[i], projection_lookup, create_correlation_matrix(nfl_teams[i], positions[i])) for i in rosters]
+    timing = measure_repeated(generate_correlated_projections, micro_repeats, roster_args)
+    records.append({**base, 'stage': 'generate_correlated_projections', **timing})
+
+    for correlation in correlations:
+        # Each pass builds from an empty factor cache, so the traced pass pays for the same factorizations
+        def build_model():
+            factor_cache = FactorCache()
+            build_simulation_model(draft_results, registry, correlation, factor_cache)
+            return factor_cache
+
+        factor_cache, timing = measure(build_model)
+        record = {**base, 'stage': 'build_simulation_model', 'correlation': correlation, **timing}
+        if correlation == 'roster':
+            record['factor_cache'] = factor_cache.stats()
+        records.append(record)
+
+        _, timing = measure(simulate_team_outcomes, draft_results, registry, num_simulations, batch_size=batch_size, correlation=correlation, workers=workers, seed=0)
+        records.append({**base, 'stage': 'simulate_team_outcomes', 'correlation': correlation, 'sims': num_simulations,
+                        'batch_size': batch_size, 'workers': workers, 'sims_per_sec': num_simulations / timing['seconds'], **timing})
+    return records
+
+# Function to print the stage records as an aligned table
+def print_records(records):
+    print(f"{'field':<10}{'teams':>8}  {'stage':<34}{'corr':<8}{'seconds':>12}{'sims/sec':>12}{'peak MB':>10}")
+    for record in records:
+        sims_per_sec = f"{record['sims_per_sec']:.1f}" if 'sims_per_sec' in record else ''
+        print(f"{record['field']:<10}{record['teams']:>8}  {record['stage']:<34}{record.get('correlation', ''):<8}"
+              f"{record['seconds']:>12.6f}{sims_per_sec:>12}{record['peak_mb']:>10.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the projsim pipeline on the bundled draft CSV and synthetic fields.')
+    parser.add_argument('--sims', type=int, default=1024, help='simulations per field and correlation mode')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma-separated synthetic field sizes in teams, empty for none')
+    parser.add_argument('--correlation', default='roster,global', help='comma-separated correlation modes to benchmark')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes for the simulation stage')
+    parser.add_argument('--batch-size', type=int, default=None, help='sims per batch, default scales with field size')
+    parser.add_argument('--output', default='benchmark_results.json', help='where to write the JSON results')
+    args = parser.parse_args(argv)
+
+    correlations = [mode for mode in args.correlation.split(',') if mode]
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    registry = as_player_registry(projections)
+
+    jit = measure_jit_warmup()
+    bundled_df = pd.read_csv(BUNDLED_CSV)
+    records = benchmark_field('bundled', bundled_df, registry, args.sims, correlations, args.workers, args.batch_size)
+    for size in sizes:
+        records += benchmark_field('synthetic', synthetic_field(size, bundled_df), registry, args.sims, correlations, args.workers, args.batch_size)
+
+    results = {
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'cpu_count': os.cpu_count()},
+        'jit_warmup': jit,
+        'records': records,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    for name, timing in jit.items():
+        print(f"JIT {name}: first call {timing['first_call_seconds']:.3f}s, warm call {timing['warm_call_seconds'] * 1e6:.1f}us")
+    print_records(records)
+    print(f"Wrote {args.output}")
+
+if __name__ == '__main__':
+    main()
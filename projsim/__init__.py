@@ -0,0 +1,24 @@
+from .instrumentation import SimulationProfiler
+from .payouts import DEFAULT_PAYOUTS, PayoutTable
+from .simulation import (
+    DraftResults, FactorCache, PlayerRegistry, as_player_registry, build_simulation_model, index_draft_results,
+    prepare_draft_results, projections, run_parallel_simulations, simulate_team_outcomes, simulate_team_projections,
+    summarize_results, warm_up,
+)
+
+# Exports of the feature modules, loaded on first access so importing projsim does not pull in scipy.special or pandas
+_LAZY_EXPORTS = {
+    'VarianceReduction': 'variance_reduction',
+    'StoppingRule': 'stopping',
+    'FieldEvaluator': 'evaluator',
+    'IncrementalSimulation': 'incremental',
+    'FieldGenerator': 'field_generator',
+    'load_field': 'field_store',
+    'save_field': 'field_store',
+}
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        from importlib import import_module
+        return getattr(import_module(f'.{_LAZY_EXPORTS[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,282 @@
+import numpy as np
+
+# Sims are folded into the floating-point moments, and into the weighted finish counts and histogram, in blocks of
+# MERGE_BLOCK consecutive sims, in sim order. Batches start on block boundaries, so the statistics are bit-identical
+# however the sims are batched or spread over workers
+MERGE_BLOCK = 64
+
+# Function to combine two (count, mean, sum of squared deviations) summaries, Chan et al.'s pairwise update
+def combine_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (count_b / count)
+    m2 = m2_a + m2_b + delta ** 2 * (count_a * count_b / count)
+    return mean, m2
+
+# Function to return the (weighted) mean and sum of squared deviations of a block of values per team
+def weighted_moments(values, weights=None):
+    if weights is None:
+        mean = values.mean(axis=0)
+        return mean, ((values - mean) ** 2).sum(axis=0)
+    mean = (values * weights[:, None]).sum(axis=0) / weights.sum()
+    return mean, (weights[:, None] * (values - mean) ** 2).sum(axis=0)
+
+# Function to reduce one block of sims to its count, payout total, the payout and points means and squared deviations
+# and, with controls, the control-variate sums. With importance weights the payouts are weighted per sim, so their
+# mean is the unbiased estimate, while the points moments are weighted means and deviations over the weight total.
+# realized_payouts, when the payouts are conditional expectations or weighted, adds the moments of the payouts the
+# teams actually won, weighted like the points
+def block_moments(total_points, payouts, weights=None, controls=None, realized_payouts=None):
+    points_weight = len(total_points) if weights is None else weights.sum()
+    points_mean, points_m2 = weighted_moments(total_points, weights)
+    realized = None if realized_payouts is None else weighted_moments(realized_payouts, weights)
+    if weights is not None:
+        payouts = payouts * weights[:, None]
+    control_sums = None
+    if controls is not None:
+        control_sums = (controls.sum(axis=0), np.einsum('bti,btj->tij', controls, controls), np.einsum('bti,bt->ti', controls, payouts))
+    payout_mean = payouts.mean(axis=0)
+    return (len(payouts), payouts.sum(axis=0), payout_mean, ((payouts - payout_mean) ** 2).sum(axis=0),
+            points_weight, points_mean, points_m2, control_sums, realized)
+
+# Function to reduce one block of weighted sims to its weighted win, top-N and cash counts, plus the histogram bin
+# of every total (in the smallest dtype that holds it) and the sim weights, binned when the block is folded
+def block_counts(ranks, cashed, bin_index, weights, top_n, bins):
+    sim_weights = weights[:, None]
+    return (np.where(ranks == 1, sim_weights, 0.0).sum(axis=0), np.where(ranks <= top_n, sim_weights, 0.0).sum(axis=0),
+            np.where(cashed, sim_weights, 0.0).sum(axis=0), bin_index.astype(np.min_scalar_type(bins - 1)), weights)
+
+# Streaming per-team outcome statistics. Each block of sims is folded in with Chan's parallel form of Welford's
+# mean/variance update, so memory stays constant in the number of simulations. Total points are also kept in a
+# fixed-width histogram per team as a bounded-memory quantile sketch over [points_low, points_high]; the end bins
+# absorb anything outside that range. A deferred accumulator (used by workers) keeps its block moments unfolded so
+# the parent can fold them in sim order.
+# A weighted accumulator takes importance weights with every batch: payouts, finish counts and the histogram are
+# likelihood-ratio weighted, so rates and Average_Payout stay unbiased. Its float counts are folded per block with
+# the moments; unweighted counts are integers, exact in any order. With control_means (teams x controls, the known
+# expectation of each control) it also sums the controls passed to update() and Average_Payout becomes the
+# control-variate regression estimate. Payout_SE is the standard error of Average_Payout either way.
+# A conditional accumulator is given conditional expected payouts, plus the realized ones. Payout_SD and Cash_Rate
+# always describe the realized payouts, weighted or conditional alike
+class OutcomeAccumulator:
+    def __init__(self, num_teams, points_low, points_high, bins=128, top_n=10, deferred=False, weighted=False, control_means=None,
+                 conditional=False):
+        count_dtype = np.float64 if weighted else np.int64
+        self.num_teams = num_teams
+        self.top_n = top_n
+        self.weighted = weighted
+        self.conditional = conditional
+        self.num_sims = 0
+        self.points_weight = 0.0
+        self.payout_total = np.zeros(num_teams)
+        self.payout_mean = np.zeros(num_teams)
+        self.payout_m2 = np.zeros(num_teams)
+        # The realized payouts differ from those averaged only when they are weighted or conditional
+        self.realized_mean = self.realized_m2 = None
+        if weighted or conditional:
+            self.realized_mean = np.zeros(num_teams)
+            self.realized_m2 = np.zeros(num_teams)
+        self.points_mean = np.zeros(num_teams)
+        self.points_m2 = np.zeros(num_teams)
+        self.wins = np.zeros(num_teams, dtype=count_dtype)
+        self.top_n_finishes = np.zeros(num_teams, dtype=count_dtype)
+        self.cashes = np.zeros(num_teams, dtype=count_dtype)
+
+        self.points_low = np.broadcast_to(np.asarray(points_low, dtype=np.float64), (num_teams,)).copy()
+        points_high = np.broadcast_to(np.asarray(points_high, dtype=np.float64), (num_teams,))
+        self.bin_width = np.maximum(points_high - self.points_low, 1e-9) / bins
+        self.histogram = np.zeros((num_teams, bins), dtype=count_dtype)
+
+        self.control_means = None
+        if control_means is not None:
+            self.control_means = np.asarray(control_means, dtype=np.float64)
+            num_controls = self.control_means.shape[1]
+            self.control_sum = np.zeros((num_teams, num_controls))
+            self.control_cross = np.zeros((num_teams, num_controls, num_controls))
+            self.control_payout = np.zeros((num_teams, num_controls))
+        self._pending_blocks = [] if deferred else None
+
+    # Function to create an empty accumulator with the same teams, histogram range, top_n, weighting, controls and
+    # conditional payouts
+    def empty_like(self, deferred=False):
+        bins = self.histogram.shape[1]
+        return OutcomeAccumulator(self.num_teams, self.points_low, self.points_low + self.bin_width * bins, bins, self.top_n,
+                                  deferred, self.weighted, self.control_means, self.conditional)
+
+    # Function to return every field as a dict of arrays, e.g. for writing a checkpoint
+    def state(self):
+        return {name: np.asarray(value) for name, value in vars(self).items() if not name.startswith('_') and value is not None}
+
+    # Function to rebuild an accumulator from the dict returned by state()
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls.__new__(cls)
+        accumulator._pending_blocks = None
+        accumulator.control_means = None
+        accumulator.conditional = False
+        accumulator.realized_mean = accumulator.realized_m2 = None
+        for name, value in state.items():
+            value = np.asarray(value)
+            setattr(accumulator, name, value.item() if value.ndim == 0 else value.copy())
+        return accumulator
+
+    # Function to fold one batch of (sims x teams) total points, payouts and finishing ranks into the statistics.
+    # weights are the batch's importance weights (weighted accumulators only), controls a (sims x teams x controls)
+    # array of control values, already multiplied by the weights. realized_payouts are the payouts the teams won,
+    # needed when payouts are conditional expectations; they give Payout_SD and Cash_Rate
+    def update(self, total_points, payouts, ranks, weights=None, controls=None, realized_payouts=None):
+        if realized_payouts is None:
+            if self.conditional:
+                raise ValueError("A conditional accumulator needs the realized payouts")
+            realized_payouts = payouts
+        # Column sums round differently depending on memory layout, so fold every batch in C order
+        total_points = np.ascontiguousarray(total_points)
+        payouts = np.ascontiguousarray(payouts)
+        realized_payouts = np.ascontiguousarray(realized_payouts)
+        ranks = np.ascontiguousarray(ranks)
+        cashed = realized_payouts > 0
+        bins = self.histogram.shape[1]
+        bin_index = np.clip(((total_points - self.points_low) / self.bin_width).astype(np.int64), 0, bins - 1)
+
+        for start in range(0, len(total_points), MERGE_BLOCK):
+            block = slice(start, start + MERGE_BLOCK)
+            block_weights = None if weights is None else weights[block]
+            moments = block_moments(total_points[block], payouts[block], block_weights, None if controls is None else controls[block],
+                                    None if self.realized_mean is None else realized_payouts[block])
+            counts = None
+            if weights is not None:
+                counts = block_counts(ranks[block], cashed[block], bin_index[block], block_weights, self.top_n, bins)
+            if self._pending_blocks is not None:
+                self._pending_blocks.append((moments, counts))
+            else:
+                self._merge_block(moments, counts)
+
+        if weights is None:
+            self.wins += (ranks == 1).sum(axis=0)
+            self.top_n_finishes += (ranks <= self.top_n).sum(axis=0)
+            self.cashes += cashed.sum(axis=0)
+            flat_index = (bin_index + np.arange(self.num_teams) * bins).ravel()
+            self.histogram += np.bincount(flat_index, minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    # Function to merge another accumulator over the same teams into this one. A deferred accumulator's blocks
+    # are folded one by one, exactly as if they had been simulated here
+    def merge(self, other):
+        if other._pending_blocks is not None:
+            for moments, counts in other._pending_blocks:
+                self._merge_block(moments, counts)
+        elif other.num_sims > 0:
+            control_sums = None if other.control_means is None else (other.control_sum, other.control_cross, other.control_payout)
+            realized = None if other.realized_mean is None else (other.realized_mean, other.realized_m2)
+            self._merge_moments(other.num_sims, other.payout_total, other.payout_mean, other.payout_m2,
+                                other.points_weight, other.points_mean, other.points_m2, control_sums, realized)
+        self.wins += other.wins
+        self.top_n_finishes += other.top_n_finishes
+        self.cashes += other.cashes
+        self.histogram += other.histogram
+
+    # Function to fold one block's moments and, for weighted sims, its counts and histogram
+    def _merge_block(self, moments, counts=None):
+        self._merge_moments(*moments)
+        if counts is not None:
+            wins, top_n_finishes, cashes, bin_index, weights = counts
+            bins = self.histogram.shape[1]
+            flat_index = (bin_index + np.arange(self.num_teams) * bins).ravel()
+            sim_weights = np.repeat(weights, self.num_teams)
+            self.wins += wins
+            self.top_n_finishes += top_n_finishes
+            self.cashes += cashes
+            self.histogram += np.bincount(flat_index, weights=sim_weights, minlength=self.histogram.size).reshape(self.histogram.shape)
+
+    def _merge_moments(self, count, payout_total, payout_mean, payout_m2, points_weight, points_mean, points_m2, control_sums=None,
+                       realized=None):
+        self.payout_mean, self.payout_m2 = combine_moments(self.num_sims, self.payout_mean, self.payout_m2, count, payout_mean, payout_m2)
+        if realized is not None:
+            self.realized_mean, self.realized_m2 = combine_moments(self.points_weight, self.realized_mean, self.realized_m2, points_weight, *realized)
+        self.points_mean, self.points_m2 = combine_moments(self.points_weight, self.points_mean, self.points_m2, points_weight, points_mean, points_m2)
+        self.payout_total += payout_total
+        self.num_sims += count
+        self.points_weight += points_weight
+        if control_sums is not None:
+            self.control_sum += control_sums[0]
+            self.control_cross += control_sums[1]
+            self.control_payout += control_sums[2]
+
+    # Function to fit the control-variate regression of payouts on the controls per team, returns the adjusted
+    # average payout and its standard error
+    def _control_estimate(self):
+        num_sims = max(self.num_sims, 1)
+        payout_mean = self.payout_total / num_sims
+        control_mean = self.control_sum / num_sims
+        control_cov = self.control_cross / num_sims - control_mean[:, :, None] * control_mean[:, None, :]
+        cross_cov = self.control_payout / num_sims - control_mean * payout_mean[:, None]
+        # pinv drops controls that never moved, e.g. a hinge a team never reached
+        beta = np.einsum('tij,tj->ti', np.linalg.pinv(control_cov, 1e-10), cross_cov)
+        estimate = payout_mean - (beta * (control_mean - self.control_means)).sum(axis=1)
+        residual_variance = np.maximum(self.payout_m2 / num_sims - (beta * cross_cov).sum(axis=1), 0.0)
+        return estimate, np.sqrt(residual_variance / max(self.num_sims - self.control_means.shape[1] - 1, 1))
+
+    # Average payout from the running payout total, or the control-variate estimate when controls are kept
+    @property
+    def average_payout(self):
+        if self.control_means is not None:
+            return self._control_estimate()[0]
+        return self.payout_total / max(self.num_sims, 1)
+
+    # Standard error of average_payout
+    @property
+    def payout_se(self):
+        if self.control_means is not None:
+            return self._control_estimate()[1]
+        return np.sqrt(self.payout_m2 / max(self.num_sims - 1, 1)) / np.sqrt(max(self.num_sims, 1))
+
+    # Standard deviation of a team's payout, from the realized payouts with the importance weights, when they
+    # differ from the averaged ones
+    @property
+    def payout_std(self):
+        if self.realized_m2 is not None:
+            return np.sqrt(self.realized_m2 / max(self.points_weight - 1, 1))
+        return np.sqrt(self.payout_m2 / max(self.num_sims - 1, 1))
+
+    @property
+    def points_std(self):
+        return np.sqrt(self.points_m2 / max(self.points_weight - 1, 1))
+
+    @property
+    def win_rate(self):
+        return self.wins / max(self.num_sims, 1)
+
+    @property
+    def top_n_rate(self):
+        return self.top_n_finishes / max(self.num_sims, 1)
+
+    @property
+    def cash_rate(self):
+        return self.cashes / max(self.num_sims, 1)
+
+    # Function to estimate total-points quantiles per team from the histogram, interpolating inside a bin
+    def points_quantile(self, q):
+        cumulative = np.cumsum(self.histogram, axis=1)
+        target = q * cumulative[:, -1]
+        bin_index = np.minimum((cumulative < target[:, None]).sum(axis=1), self.histogram.shape[1] - 1)
+        teams = np.arange(self.num_teams)
+        below = np.where(bin_index > 0, cumulative[teams, bin_index - 1], 0)
+        in_bin = self.histogram[teams, bin_index]
+        fraction = np.clip((target - below) / np.where(in_bin > 0, in_bin, 1), 0.0, 1.0)
+        return self.points_low + (bin_index + fraction) * self.bin_width
+
+    # Function to summarise the statistics as result columns. TopN_Rate keeps its name for any top_n, the
+    # rank it counts is the accumulator's top_n
+    def summary(self, quantiles=(0.1, 0.5, 0.9)):
+        columns = {
+            'Average_Payout': self.average_payout,
+            'Payout_SD': self.payout_std,
+            'Payout_SE': self.payout_se,
+            'Win_Rate': self.win_rate,
+            'TopN_Rate': self.top_n_rate,
+            'Cash_Rate': self.cash_rate,
+            'Points_Mean': self.points_mean,
+            'Points_SD': self.points_std,
+        }
+        for q in quantiles:
+            columns[f'Points_P{round(q * 100)}'] = self.points_quantile(q)
+        return columns
@@ -0,0 +1,37 @@
+import json
+import os
+import numpy as np
+from .accumulators import OutcomeAccumulator
+
+# Function to store a seed as JSON text: an int or a sequence of ints, as np.random.SeedSequence takes, kept
+# losslessly since SeedSequence entropy can exceed 64 bits. Raises ValueError for anything else
+def encode_seed(seed):
+    if isinstance(seed, (int, np.integer)):
+        seed = int(seed)
+    elif isinstance(seed, (list, tuple, np.ndarray)) and all(isinstance(value, (int, np.integer)) for value in seed):
+        seed = [int(value) for value in seed]
+    else:
+        raise ValueError(f"A checkpointed seed must be an int or a sequence of ints, got {seed!r}")
+    np.random.SeedSequence(seed)
+    return json.dumps(seed)
+
+# Function to write a simulation checkpoint: accumulator arrays, completed sim counter, the seed of the
+# per-sim RNG streams and the run configuration. The file is written beside path and renamed over it, so an
+# interrupted write never leaves a truncated checkpoint behind
+def save_checkpoint(path, accumulator, completed_sims, seed, config):
+    arrays = {f'accumulator_{name}': value for name, value in accumulator.state().items()}
+    arrays.update({f'config_{name}': value for name, value in config.items()})
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as f:
+        np.savez(f, completed_sims=completed_sims, seed=encode_seed(seed), **arrays)
+    os.replace(temporary_path, path)
+
+# Function to read a checkpoint written by save_checkpoint, returns the completed sim count, seed,
+# config dict and restored OutcomeAccumulator
+def load_checkpoint(path):
+    with np.load(path) as data:
+        accumulator_state = {name[len('accumulator_'):]: data[name] for name in data.files if name.startswith('accumulator_')}
+        config = {name[len('config_'):]: data[name].item() for name in data.files if name.startswith('config_')}
+        completed_sims = int(data['completed_sims'])
+        seed = json.loads(str(data['seed']))
+    return completed_sims, seed, config, OutcomeAccumulator.from_state(accumulator_state)
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import sys
+import time
+from .instrumentation import SimulationProfiler
+from .payouts import DEFAULT_PAYOUTS, PayoutTable
+from .simulation import (
+    PlayerRegistry, as_player_registry, index_draft_results, prepare_draft_results, projections,
+    simulate_team_outcomes,
+)
+
+NAME_COLUMNS = ('player_name', 'name', 'Name', 'Player')
+
+# Function to read projections from a JSON file ({name: {"proj": ..., "projsd": ...}} or {name: [proj, projsd]})
+# or a CSV with a player name column and proj, projsd columns
+def read_projections(path):
+    if path.endswith('.json'):
+        with open(path) as f:
+            return PlayerRegistry.from_projections(json.load(f))
+    import pandas as pd
+    projections_df = pd.read_csv(path)
+    name_column = next((column for column in NAME_COLUMNS if column in projections_df), None)
+    if name_column is None or not {'proj', 'projsd'} <= set(projections_df):
+        raise ValueError(f"{path} needs a player name column ({', '.join(NAME_COLUMNS)}) and proj, projsd columns")
+    return PlayerRegistry(projections_df[name_column].to_numpy(), projections_df['proj'].to_numpy(), projections_df['projsd'].to_numpy())
+
+# Function to read the field: a draft-results CSV or a directory written by field_store.save_field. A stored field
+# keeps its own projections, used unless registry is given. Returns (DraftResults, PlayerRegistry)
+def read_field(path, registry=None):
+    if os.path.isdir(path):
+        from .field_store import load_field
+        draft_results, stored_registry = load_field(path)
+        registry = registry or stored_registry
+        return index_draft_results(draft_results, registry), registry
+    import pandas as pd
+    registry = registry or as_player_registry(projections)
+    return prepare_draft_results(pd.read_csv(path), registry), registry
+
+# Function to write the results table as CSV, chunk_rows teams at a time so a large field is never formatted as
+# one string. The summary columns are computed once from the accumulator
+def write_results(path, draft_results, accumulator, chunk_rows=100_000):
+    import pandas as pd
+    columns = {'Team': draft_results.teams, **accumulator.summary()}
+    num_teams = len(draft_results.teams)
+    output = sys.stdout if path == '-' else open(path, 'w', newline='')
+    try:
+        for start in range(0, max(num_teams, 1), chunk_rows):
+            chunk = pd.DataFrame({name: value[start:start + chunk_rows] for name, value in columns.items()})
+            chunk.to_csv(output, header=start == 0, index=False)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+# Function to build the variance-reduction options from the command-line flags, None when none are set
+def variance_reduction_from_args(args):
+    if not (args.antithetic or args.conditional or args.control_variates):
+        return None
+    from .variance_reduction import VarianceReduction
+    return VarianceReduction(antithetic=args.antithetic, conditional=args.conditional, control_variates=args.control_variates)
+
+# Function to build the adaptive stopping rule from the command-line flags, None when no target is set
+def stopping_from_args(args):
+    if args.precision is None and args.time_budget is None:
+        return None
+    from .stopping import StoppingRule
+    return StoppingRule(half_width=args.precision, time_budget=args.time_budget)
+
+# Function to reject flag values and combinations the simulation cannot run, through parser.error so the
+# message comes with the usage line instead of a traceback
+def validate_args(parser, args):
+    for flag, value in (('--sims', args.sims), ('--workers', args.workers), ('--batch-size', args.batch_size), ('--top-n', args.top_n)):
+        if value is not None and value < 1:
+            parser.error(f"{flag} must be at least 1, got {value}")
+    for flag, value in (('--precision', args.precision), ('--time-budget', args.time_budget)):
+        if value is not None and not value > 0:
+            parser.error(f"{flag} must be positive, got {value}")
+    if args.conditional and args.correlation != 'roster':
+        parser.error("--conditional needs --correlation roster, whose teams draw independently")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='projsim', description='Simulate a drafted field and write each team\'s payout and finish statistics.')
+    parser.add_argument('rosters', help='draft-results CSV (Team, Player_1_Name .. Player_6_Team columns) or a stored field directory')
+    parser.add_argument('--projections', help='projections CSV (player_name, proj, projsd) or JSON, default the bundled projections')
+    parser.add_argument('--payouts', help='payout table CSV (min_rank, max_rank, payout or rank, payout), default the bundled table')
+    parser.add_argument('--ties', default='split', choices=('split', 'rank'), help='how tied teams are paid')
+    parser.add_argument('--sims', type=int, default=10000, help='simulations to run, the cap with --precision or --time-budget')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, default every core')
+    parser.add_argument('--seed', type=int, default=None, help='seed for reproducible results on any worker count')
+    parser.add_argument('--correlation', default='roster', choices=('roster', 'global'), help='correlation mode')
+    parser.add_argument('--by-pod', action='store_true', help='rank and pay each Simulation pod separately')
+    parser.add_argument('--top-n', type=int, default=10, help='finish rank counted by the TopN_Rate column')
+    parser.add_argument('--batch-size', type=int, default=None, help='sims per batch, default about 4M player slots per batch, 64 to 256 sims')
+    parser.add_argument('--checkpoint', help='checkpoint file, resumed from when it exists')
+    parser.add_argument('--precision', type=float, default=None, help='stop once every Average_Payout is known to +/- this at 95%%')
+    parser.add_argument('--time-budget', type=float, default=None, help='stop after this many seconds')
+    parser.add_argument('--antithetic', action='store_true', help='antithetic draws')
+    parser.add_argument('--conditional', action='store_true', help='conditional expected payouts (roster correlation only)')
+    parser.add_argument('--control-variates', action='store_true', help='projection control variates')
+    parser.add_argument('--output', default='results.csv', help='where to write the results CSV, - for stdout')
+    parser.add_argument('--quiet', action='store_true', help='no progress on stderr')
+    args = parser.parse_args(argv)
+    validate_args(parser, args)
+
+    registry = read_projections(args.projections) if args.projections else None
+    draft_results, registry = read_field(args.rosters, registry)
+    if args.payouts:
+        payout_table = PayoutTable.from_csv(args.payouts, args.ties)
+    else:
+        payout_table = PayoutTable(DEFAULT_PAYOUTS.min_ranks, DEFAULT_PAYOUTS.max_ranks, DEFAULT_PAYOUTS.amounts, args.ties)
+    stopping = stopping_from_args(args)
+
+    def progress(sims_done, num_simulations):
+        print(f"\r{sims_done}/{num_simulations} sims", end='', file=sys.stderr, flush=True)
+
+    profiler = SimulationProfiler(progress=None if args.quiet else progress)
+    start = time.perf_counter()
+    accumulator = simulate_team_outcomes(draft_results, registry, args.sims, batch_size=args.batch_size, correlation=args.correlation,
+                                         workers=args.workers, seed=args.seed, payout_table=payout_table, by_pod=args.by_pod,
+                                         top_n=args.top_n, checkpoint_path=args.checkpoint, profiler=profiler,
+                                         variance_reduction=variance_reduction_from_args(args), stopping=stopping)
+    write_results(args.output, draft_results, accumulator)
+    if not args.quiet:
+        reason = f" ({stopping.reason})" if stopping is not None else ''
+        print(f"\n{accumulator.num_sims} sims{reason} for {len(draft_results.teams)} teams in {time.perf_counter() - start:.1f}s, "
+              f"wrote {args.output}", file=sys.stderr)
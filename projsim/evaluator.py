@@ -0,0 +1,192 @@
+import json
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from .payouts import DEFAULT_PAYOUTS, top_k_order
+from .simulation import (
+    DraftResults, FactorCache, RosterModel, as_player_registry, build_simulation_model, field_version, index_draft_results,
+    plan_simulation_batches, player_attributes, prepare_draft_results, projection_version,
+)
+
+# Long-lived evaluator scoring candidate rosters against one simulated field. load() simulates the field once and
+# keeps, per sim, the field's total at every rank where the payout drops (plus ranks 1 and top_n), which is all a
+# candidate's payout depends on: entering the field it finishes k-th or better exactly when it beats the field's
+# k-th best total, ties going to the field team. 'global' mode also keeps every player's draws, so candidates
+# built from the field's players are scored on the same correlated outcomes. In 'roster' mode candidates draw
+# independently of the field, so their expected payout given each field sim is exact from their normal total.
+# load() only re-simulates when the field or projection version changes, and the factor cache survives reloads.
+# Wrap one instance in st.cache_resource to share it across Streamlit reruns, or serve it with serve()
+class FieldEvaluator:
+    def __init__(self, num_simulations, correlation='global', seed=0, payout_table=None, top_n=10, batch_size=256, factor_cache=None):
+        self.num_simulations = num_simulations
+        self.correlation = correlation
+        self.seed = seed
+        self.payout_table = payout_table or DEFAULT_PAYOUTS
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.factor_cache = factor_cache or FactorCache()
+        self.drop_ranks, self.drops = self.payout_table.drops()
+        self.cut_ranks = np.union1d(self.drop_ranks, [1, top_n, max(self.payout_table.last_paid_rank, 1)]).astype(np.int64)
+        self.versions = None
+
+    # Function to load a field (draft-results DataFrame or DraftResults) and projections, simulating the field
+    # unless both versions match the loaded ones. Pass version strings to skip fingerprinting. Returns self
+    def load(self, draft_results, projection_lookup, field_key=None, projection_key=None):
+        registry = as_player_registry(projection_lookup)
+        if isinstance(draft_results, DraftResults):
+            draft_results = index_draft_results(draft_results, registry)
+        else:
+            draft_results = prepare_draft_results(draft_results, registry)
+        versions = (field_key or field_version(draft_results), projection_key or projection_version(registry))
+        if versions == self.versions:
+            return self
+
+        # Evict the old field state before simulating the new one
+        self.versions = None
+        self.units = self.cuts = None
+        self.registry = registry
+        self.draft_results = draft_results
+        self.positions, self.nfl_teams = player_attributes(draft_results)
+        self.model = build_simulation_model(draft_results, registry, self.correlation, self.factor_cache)
+        self.simulate_field()
+        self.versions = versions
+        return self
+
+    # Function to simulate the field and keep its totals at the cut ranks, (sims x cut ranks) with -inf past the
+    # field size. 'global' mode also keeps the (sims x players) unit draws
+    def simulate_field(self):
+        self.cuts = np.empty((self.num_simulations, len(self.cut_ranks)))
+        if self.correlation == 'global':
+            self.units = np.empty((self.num_simulations, len(self.model.rostered)))
+        all_teams = np.arange(len(self.draft_results.teams))
+        depth = min(int(self.cut_ranks[-1]), len(all_teams))
+        start = 0
+        for num_batch, rng in plan_simulation_batches(self.num_simulations, self.batch_size, self.seed):
+            if self.units is not None:
+                self.units[start:start + num_batch] = self.model.sample_units(num_batch, rng)
+                total_points = self.model.totals_from_units(self.units[start:start + num_batch], all_teams)
+            else:
+                total_points = self.model.sample_totals(num_batch, rng)
+            sorted_points = np.take_along_axis(total_points, top_k_order(total_points, depth), axis=1)
+            in_field = self.cut_ranks <= len(all_teams)
+            self.cuts[start:start + num_batch] = -np.inf
+            self.cuts[start:start + num_batch, in_field] = sorted_points[:, self.cut_ranks[in_field] - 1]
+            start += num_batch
+
+    # Function to turn candidates into a DraftResults indexing the loaded registry. Candidates are a draft-results
+    # DataFrame, a DraftResults or a list of player-name rosters; name rosters take positions and NFL teams from
+    # the field, so every player must be rostered in it
+    def prepare_candidates(self, candidates, labels=None):
+        if isinstance(candidates, DraftResults):
+            return index_draft_results(candidates, self.registry)
+        if isinstance(candidates, pd.DataFrame):
+            return prepare_draft_results(candidates, self.registry)
+        player_ids = np.array([self.registry.ids(roster) for roster in candidates], dtype=np.int32).reshape(len(candidates), -1)
+        missing = self.positions[player_ids] == ''
+        if missing.any():
+            raise ValueError(f"Players not rostered in the field: {sorted(set(self.registry.names[player_ids[missing]]))}")
+        position_names, position_ids = np.unique(self.positions[player_ids], return_inverse=True)
+        if labels is None:
+            labels = np.array([f'Candidate {i + 1}' for i in range(len(candidates))])
+        return DraftResults(player_ids, position_ids.reshape(player_ids.shape).astype(np.int8), self.nfl_teams[player_ids],
+                            self.registry.names, position_names, self.draft_results.nfl_team_names, np.asarray(labels),
+                            np.zeros(len(player_ids), dtype=np.int32))
+
+    # Function to score a batch of candidate rosters against the loaded field, see prepare_candidates. Returns one
+    # row per candidate with its average payout and standard error, win/top-N/cash rates and mean total points.
+    # The rank counted by TopN_Rate is in scores.attrs['top_n']
+    def score(self, candidates, labels=None, chunk_size=None):
+        if self.versions is None:
+            raise RuntimeError("No field loaded, call load() first")
+        candidates = self.prepare_candidates(candidates, labels)
+        num_candidates = len(candidates.teams)
+        # Chunks keep the (sims x candidates) intermediates near 4M values
+        chunk_size = chunk_size or max(1, 4_000_000 // self.num_simulations)
+        columns = {name: np.empty(num_candidates) for name in ('Average_Payout', 'Payout_SE', 'Win_Rate', 'TopN_Rate', 'Cash_Rate', 'Points_Mean')}
+        for start in range(0, num_candidates, chunk_size):
+            chunk = candidates._replace(**{name: getattr(candidates, name)[start:start + chunk_size]
+                                           for name in ('player_ids', 'position_ids', 'nfl_team_ids', 'teams', 'pods')})
+            for name, value in self.score_chunk(chunk).items():
+                columns[name][start:start + chunk_size] = value
+        scores = pd.DataFrame({'Team': candidates.teams, **columns})
+        scores.attrs['top_n'] = self.top_n
+        return scores
+
+    # Function to score one chunk of candidates. finish(k) is, per sim and candidate, the (probability of)
+    # finishing k-th or better: an indicator on the candidate's drawn total in 'global' mode, its normal
+    # survival at the cut in 'roster' mode
+    def score_chunk(self, candidates):
+        if self.units is not None:
+            index = np.searchsorted(self.model.rostered, candidates.player_ids)
+            index = np.minimum(index, len(self.model.rostered) - 1)
+            if (self.model.rostered[index] != candidates.player_ids).any():
+                raise ValueError("In 'global' mode every candidate player must be rostered in the field")
+            total_points = None
+            for slot in range(index.shape[1]):
+                slot_points = self.model.means[index[:, slot]] + self.units[:, index[:, slot]] * self.model.std_dev[index[:, slot]]
+                total_points = slot_points if total_points is None else total_points + slot_points
+            points_mean = total_points.mean(axis=0)
+
+            def finish(k):
+                return total_points > self.cuts[:, k][:, None]
+        else:
+            mean, std_dev = RosterModel(candidates, self.registry, self.factor_cache).total_moments()
+            std_dev = np.maximum(std_dev, 1e-12)
+            points_mean = mean
+
+            def finish(k):
+                return ndtr((mean - self.cuts[:, k][:, None]) / std_dev)
+
+        payouts = np.zeros((self.num_simulations, len(candidates.teams)))
+        for rank, drop in zip(self.drop_ranks, self.drops):
+            payouts += drop * finish(np.searchsorted(self.cut_ranks, rank))
+        rate = {rank: finish(np.searchsorted(self.cut_ranks, rank)).mean(axis=0)
+                for rank in (1, self.top_n, max(self.payout_table.last_paid_rank, 1))}
+        return {
+            'Average_Payout': payouts.mean(axis=0),
+            'Payout_SE': payouts.std(axis=0, ddof=1) / np.sqrt(self.num_simulations) if self.num_simulations > 1 else np.zeros(len(candidates.teams)),
+            'Win_Rate': rate[1],
+            'TopN_Rate': rate[self.top_n],
+            'Cash_Rate': rate[max(self.payout_table.last_paid_rank, 1)],
+            'Points_Mean': points_mean,
+        }
+
+# Function to serve an evaluator on a local HTTP endpoint. POST /score with {"candidates": [[player names], ...],
+# "labels": [...]} returns the score rows as JSON records. POST /projections with {"projections": {name: {"proj":
+# ..., "projsd": ...}}} replaces the projections of those players and reloads the field if anything changed
+def serve(evaluator, host='127.0.0.1', port=8765):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if self.path == '/score':
+                    results = evaluator.score(request['candidates'], request.get('labels'))
+                    response = {'versions': evaluator.versions, 'results': results.to_dict(orient='records')}
+                elif self.path == '/projections':
+                    registry = evaluator.registry
+                    proj, projsd = registry.proj.copy(), registry.projsd.copy()
+                    for name, values in request['projections'].items():
+                        i = registry.index[name]
+                        proj[i] = values.get('proj', proj[i])
+                        projsd[i] = values.get('projsd', projsd[i])
+                    evaluator.load(evaluator.draft_results, type(registry)(registry.names, proj, projsd))
+                    response = {'versions': evaluator.versions}
+                else:
+                    self.send_error(404)
+                    return
+                status = 200
+            except (KeyError, ValueError, TypeError) as error:
+                status, response = 400, {'error': str(error)}
+            body = json.dumps(response).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = HTTPServer((host, port), Handler)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,235 @@
+import numpy as np
+from .simulation import DraftResults, player_attributes
+
+# Draft tendencies of a synthetic field. Teams are snake-drafted pod_size at a time, roster_size picks each, and
+# position_limits maps a position to the (min, max) players a roster holds. Each pick takes an available player
+# with weight exp(-adp / adp_temperature), so a low temperature follows ADP closely. stack_rate is the share of
+# rosters that stack their QB with a teammate: stackers weight stack-forming picks up by stack_boost, everyone
+# else weights them down by the same factor. Not every stacker finds a stack (and not every non-stacker avoids
+# one), so the generator calibrates its share of stackers to land on stack_rate
+class DraftTendencies:
+    def __init__(self, position_limits, stack_rate=0.65, pod_size=6, roster_size=6, adp_temperature=2.0, stack_boost=1000.0):
+        self.position_limits = dict(position_limits)
+        self.stack_rate = stack_rate
+        self.pod_size = pod_size
+        self.roster_size = roster_size
+        self.adp_temperature = adp_temperature
+        self.stack_boost = stack_boost
+
+        minimum = sum(low for low, _ in self.position_limits.values())
+        maximum = sum(high for _, high in self.position_limits.values())
+        if not minimum <= roster_size <= maximum:
+            raise ValueError(f"Position limits cannot fill a roster of {roster_size}")
+
+    # Build tendencies matching a drafted field: roster and pod size, the fewest and most players of each position
+    # any roster holds and the share of rosters whose QB has a teammate. overrides replace any measured value
+    @classmethod
+    def from_draft_results(cls, draft_results, **overrides):
+        counts = np.stack([(draft_results.position_ids == code).sum(axis=1) for code in range(len(draft_results.position_names))], axis=1)
+        measured = {
+            'position_limits': {name: (int(counts[:, code].min()), int(counts[:, code].max())) for code, name in enumerate(draft_results.position_names)},
+            'stack_rate': float(qb_stacked(draft_results.position_ids, draft_results.nfl_team_ids, draft_results.position_names).mean()),
+            'pod_size': int(np.bincount(draft_results.pods).max()),
+            'roster_size': draft_results.player_ids.shape[1],
+        }
+        return cls(**{**measured, **overrides})
+
+# Function to flag the rosters whose QB shares an NFL team with another rostered player
+def qb_stacked(position_ids, nfl_team_ids, position_names):
+    qb_code = np.flatnonzero(position_names == 'QB')
+    if len(qb_code) == 0:
+        return np.zeros(len(position_ids), dtype=bool)
+    is_qb = position_ids == qb_code[0]
+    qb_team = np.where(is_qb, nfl_team_ids, -1).max(axis=1)
+    return ((nfl_team_ids == qb_team[:, None]) & ~is_qb & (qb_team[:, None] >= 0)).any(axis=1)
+
+# Function to find each team's pick number in every round of its pod's snake draft, 1 is the first pick
+def snake_pick_numbers(pods, roster_size):
+    order = np.argsort(pods, kind='stable')
+    pod_sizes = np.bincount(pods)
+    pod_starts = np.cumsum(pod_sizes) - pod_sizes
+    slots = np.empty(len(pods), dtype=np.int64)
+    slots[order] = np.arange(len(pods)) - pod_starts[pods[order]]
+    size = pod_sizes[pods][:, None]
+    rounds = np.arange(roster_size)
+    return rounds * size + np.where(rounds % 2 == 0, slots[:, None], size - 1 - slots[:, None]) + 1
+
+# Draftable players: registry ids with their position and NFL-team codes (into position_names / nfl_team_names),
+# average draft position and a relative pick weight (1 unless tilted toward an ownership target)
+class PlayerPool:
+    def __init__(self, player_ids, positions, nfl_teams, adp, position_names, nfl_team_names, pick_weight=None):
+        self.player_ids = np.asarray(player_ids, dtype=np.int32)
+        self.positions = np.asarray(positions, dtype=np.int8)
+        self.nfl_teams = np.asarray(nfl_teams, dtype=np.int16)
+        self.adp = np.asarray(adp, dtype=np.float64)
+        self.position_names = np.asarray(position_names, dtype=str)
+        self.nfl_team_names = np.asarray(nfl_team_names, dtype=str)
+        self.pick_weight = np.ones(len(self.player_ids)) if pick_weight is None else np.asarray(pick_weight, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    # Build the pool of registry players found in a drafted field (with registry player ids), taking positions and
+    # NFL teams from their roster slots and ADP from their average snake pick number. adp (name -> ADP) overrides
+    # players' ADP, or adds players nobody drafted when added_players (name -> (position, NFL team), labels of the
+    # field) gives their position and NFL team. ownership (name -> share of rosters) tilts each named player's pick
+    # weight by the ratio of the target to the player's ownership in the drafted field
+    @classmethod
+    def from_draft_results(cls, draft_results, registry, adp=None, ownership=None, added_players=None):
+        num_players = len(registry)
+        added_players = added_players or {}
+        picks = snake_pick_numbers(draft_results.pods, draft_results.player_ids.shape[1])
+        drafted = np.bincount(draft_results.player_ids.ravel(), minlength=num_players)
+        player_adp = np.bincount(draft_results.player_ids.ravel(), weights=picks.ravel(), minlength=num_players) / np.maximum(drafted, 1)
+        player_adp[drafted == 0] = np.nan
+
+        _, nfl_teams = player_attributes(draft_results)
+        positions = np.zeros(num_players, dtype=np.int8)
+        positions[draft_results.player_ids.ravel()] = draft_results.position_ids.ravel()
+        missing_adp = added_players.keys() - (adp or {}).keys()
+        if missing_adp:
+            raise ValueError(f"Added players need an ADP in adp: {', '.join(sorted(missing_adp))}")
+        for name, value in (adp or {}).items():
+            i = registry.index[name]
+            if drafted[i] == 0:
+                if name not in added_players:
+                    raise ValueError(f"{name} is not in the drafted field, give their position and NFL team in added_players")
+                position, nfl_team = added_players[name]
+                positions[i] = label_code(draft_results.position_names, position, 'position')
+                nfl_teams[i] = label_code(draft_results.nfl_team_names, nfl_team, 'NFL team')
+            player_adp[i] = value
+        in_pool = ~np.isnan(player_adp)
+        pick_weight = np.ones(num_players)
+        for name, target in (ownership or {}).items():
+            i = registry.index[name]
+            pick_weight[i] = target / max(drafted[i] / len(draft_results.player_ids), 1 / len(draft_results.player_ids))
+
+        ids = np.flatnonzero(in_pool)
+        return cls(ids, positions[ids], nfl_teams[ids], player_adp[ids], draft_results.position_names,
+                   draft_results.nfl_team_names, pick_weight[ids])
+
+# Function to find the code of a position or NFL-team label in a field's label table
+def label_code(labels, label, kind):
+    codes = np.flatnonzero(labels == label)
+    if not len(codes):
+        raise ValueError(f"Unknown {kind} {label!r}, the field has {', '.join(map(str, labels))}")
+    return codes[0]
+
+# Synthetic contest fields drafted from a player pool with the given tendencies. Whole pods are drafted at once,
+# every pick vectorized over the pods of a batch, and rosters come out as registry player ids in the DraftResults
+# layout, so a field of any size streams straight into the simulator without a DataFrame
+class FieldGenerator:
+    def __init__(self, pool, tendencies, registry, seed=None):
+        self.pool = pool
+        self.tendencies = tendencies
+        self.registry = registry
+        self.rng = np.random.default_rng(seed)
+
+        self.limits = np.zeros((len(pool.position_names), 2), dtype=np.int64)
+        for code, name in enumerate(pool.position_names):
+            self.limits[code] = tendencies.position_limits.get(name, (0, 0))
+        available = np.bincount(pool.positions, minlength=len(pool.position_names))
+        if (available < self.limits[:, 0] * tendencies.pod_size).any() or len(pool) < tendencies.pod_size * tendencies.roster_size:
+            raise ValueError("Player pool is too small to fill a pod under the position limits")
+        qb_code = np.flatnonzero(pool.position_names == 'QB')
+        self.is_qb = pool.positions == qb_code[0] if len(qb_code) else np.zeros(len(pool), dtype=bool)
+        self.log_weight = np.log(np.maximum(pool.pick_weight, 1e-300)) - pool.adp / tendencies.adp_temperature
+        self.stacker_share = self.calibrate_stacker_share()
+
+    # Build a generator whose pool and tendencies match a drafted field, see PlayerPool and DraftTendencies
+    @classmethod
+    def from_draft_results(cls, draft_results, registry, seed=None, adp=None, ownership=None, added_players=None, **tendencies):
+        pool = PlayerPool.from_draft_results(draft_results, registry, adp, ownership, added_players)
+        return cls(pool, DraftTendencies.from_draft_results(draft_results, **tendencies), registry, seed)
+
+    # Function to pick the share of stackers that gives stack_rate, from the stack rates of two pilot drafts in
+    # which every roster is a stacker and none is
+    def calibrate_stacker_share(self, pilot_pods=256):
+        rates = []
+        for stacker_share in (1.0, 0.0):
+            rosters = self.draft_pods(pilot_pods, stacker_share).reshape(-1, self.tendencies.roster_size)
+            rates.append(qb_stacked(self.pool.positions[rosters], self.pool.nfl_teams[rosters], self.pool.position_names).mean())
+        if rates[0] <= rates[1]:
+            return self.tendencies.stack_rate
+        return float(np.clip((self.tendencies.stack_rate - rates[1]) / (rates[0] - rates[1]), 0.0, 1.0))
+
+    # Function to snake-draft num_pods pods, returns (pods x pod_size x roster_size) pool indices
+    def draft_pods(self, num_pods, stacker_share=None):
+        stacker_share = self.stacker_share if stacker_share is None else stacker_share
+        pool, tendencies = self.pool, self.tendencies
+        pod_size, roster_size = tendencies.pod_size, tendencies.roster_size
+        pods = np.arange(num_pods)
+        taken = np.zeros((num_pods, len(pool)), dtype=bool)
+        rosters = np.empty((num_pods, pod_size, roster_size), dtype=np.int32)
+        position_counts = np.zeros((num_pods, pod_size, len(self.limits)), dtype=np.int64)
+        nfl_teams_held = np.zeros((num_pods, pod_size, len(pool.nfl_team_names)), dtype=bool)
+        qb_team = np.full((num_pods, pod_size), -1, dtype=np.int64)
+        stacked = np.zeros((num_pods, pod_size), dtype=bool)
+        stack_weight = np.log(np.where(self.rng.random((num_pods, pod_size)) < stacker_share, tendencies.stack_boost, 1 / tendencies.stack_boost))
+
+        for pick in range(pod_size * roster_size):
+            round_index, turn = divmod(pick, pod_size)
+            slot = turn if round_index % 2 == 0 else pod_size - 1 - turn
+
+            # A position stays open while under its max, unless the picks left are needed for positions under their min
+            counts = position_counts[:, slot]
+            needed = np.maximum(self.limits[:, 0] - counts, 0).sum(axis=1)
+            open_positions = (counts < self.limits[:, 1]) & ((roster_size - round_index > needed)[:, None] | (counts < self.limits[:, 0]))
+            allowed = ~taken & open_positions[:, pool.positions]
+
+            # A pick forms a stack if it is a QB from an NFL team already rostered, or a teammate of the rostered QB
+            forms_stack = np.where(self.is_qb, nfl_teams_held[:, slot][:, pool.nfl_teams], pool.nfl_teams == qb_team[:, slot][:, None])
+            log_weight = self.log_weight + np.where(forms_stack & ~stacked[:, slot][:, None], stack_weight[:, slot][:, None], 0.0)
+            log_weight = np.where(allowed, log_weight, -np.inf)
+            weight = np.exp(log_weight - log_weight.max(axis=1, keepdims=True))
+
+            cumulative = np.cumsum(weight, axis=1)
+            chosen = (cumulative < self.rng.random(num_pods)[:, None] * cumulative[:, -1:]).sum(axis=1)
+            rosters[:, slot, round_index] = chosen
+            taken[pods, chosen] = True
+            position_counts[pods, slot, pool.positions[chosen]] += 1
+            stacked[:, slot] |= forms_stack[pods, chosen]
+            chosen_qb = self.is_qb[chosen]
+            qb_team[:, slot] = np.where(chosen_qb, pool.nfl_teams[chosen], qb_team[:, slot])
+            nfl_teams_held[pods[~chosen_qb], slot, pool.nfl_teams[chosen[~chosen_qb]]] = True
+        return rosters
+
+    # Function to generate a field of num_teams rosters in chunks of about batch_size teams, yielding each chunk as a
+    # DraftResults with registry player ids. Teams are named and pod-coded continuously across chunks
+    def batches(self, num_teams, batch_size=60000):
+        pod_size = self.tendencies.pod_size
+        pods_per_batch = max(1, batch_size // pod_size)
+        for first_team in range(0, num_teams, pods_per_batch * pod_size):
+            num_batch = min(pods_per_batch * pod_size, num_teams - first_team)
+            rosters = self.draft_pods(-(-num_batch // pod_size)).reshape(-1, self.tendencies.roster_size)[:num_batch]
+            team_numbers = np.arange(first_team, first_team + num_batch)
+            yield DraftResults(
+                player_ids=self.pool.player_ids[rosters],
+                position_ids=self.pool.positions[rosters],
+                nfl_team_ids=self.pool.nfl_teams[rosters],
+                player_names=self.registry.names,
+                position_names=self.pool.position_names,
+                nfl_team_names=self.pool.nfl_team_names,
+                teams=np.char.add('Team ', (team_numbers + 1).astype(str)),
+                pods=(team_numbers // pod_size).astype(np.int32),
+            )
+
+    # Function to generate a whole field of num_teams rosters as one DraftResults, filled chunk by chunk
+    def generate(self, num_teams, batch_size=60000):
+        roster_size = self.tendencies.roster_size
+        player_ids = np.empty((num_teams, roster_size), dtype=np.int32)
+        position_ids = np.empty((num_teams, roster_size), dtype=np.int8)
+        nfl_team_ids = np.empty((num_teams, roster_size), dtype=np.int16)
+        pods = np.empty(num_teams, dtype=np.int32)
+        teams = np.empty(num_teams, dtype=f'U{len(str(num_teams)) + 5}')
+        start = 0
+        for chunk in self.batches(num_teams, batch_size):
+            end = start + len(chunk.pods)
+            player_ids[start:end] = chunk.player_ids
+            position_ids[start:end] = chunk.position_ids
+            nfl_team_ids[start:end] = chunk.nfl_team_ids
+            pods[start:end] = chunk.pods
+            teams[start:end] = chunk.teams
+            start = end
+        return DraftResults(player_ids, position_ids, nfl_team_ids, self.registry.names, self.pool.position_names,
+                            self.pool.nfl_team_names, teams, pods)
@@ -0,0 +1,129 @@
+import json
+import os
+import numpy as np
+from .simulation import DraftResults, PlayerRegistry, index_draft_results
+
+# A stored field is a directory holding field.json (format, sizes and the position / NFL-team label tables), the
+# player table (player_names, proj and projsd) and one array per roster column: int32 player ids into the player
+# table, int8 position codes, int16 NFL-team codes, team labels and int32 pod codes. The 'npy' format keeps one
+# .npy file per array and opens them memory-mapped, so repeated runs and worker processes share the OS page cache
+# instead of parsing anything; 'parquet' writes players.parquet and rosters.parquet and needs pyarrow
+PLAYER_ARRAYS = ('player_names', 'proj', 'projsd')
+ROSTER_ARRAYS = ('player_ids', 'position_ids', 'nfl_team_ids', 'teams', 'pods')
+FORMATS = ('npy', 'parquet')
+
+# Function to import pyarrow only when a Parquet field is read or written
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The parquet field format needs pyarrow, install it or use format='npy'") from None
+    return pyarrow
+
+# Function to write field.json for a stored field
+def write_metadata(directory, file_format, num_teams, roster_size, position_names, nfl_team_names):
+    metadata = {'format': file_format, 'num_teams': num_teams, 'roster_size': roster_size,
+                'position_names': [str(name) for name in position_names], 'nfl_team_names': [str(name) for name in nfl_team_names]}
+    with open(os.path.join(directory, 'field.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+# Function to read and check field.json of a stored field
+def read_metadata(directory):
+    with open(os.path.join(directory, 'field.json')) as f:
+        metadata = json.load(f)
+    if metadata['format'] not in FORMATS:
+        raise ValueError(f"Unknown field format: {metadata['format']}")
+    return metadata
+
+# Function to write a player registry as .npy arrays in directory
+def save_players(directory, registry):
+    os.makedirs(directory, exist_ok=True)
+    for name, value in zip(PLAYER_ARRAYS, (registry.names, registry.proj, registry.projsd)):
+        np.save(os.path.join(directory, f'{name}.npy'), value)
+
+# Function to open the player registry written by save_players, memory-mapped unless mmap_mode is None
+def load_players(directory, mmap_mode='r'):
+    return PlayerRegistry(*(np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in PLAYER_ARRAYS))
+
+# Function to write a field and the registry its player ids index. The rosters are re-coded to the registry first
+def save_field(directory, draft_results, registry, file_format='npy'):
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown field format: {file_format}")
+    draft_results = index_draft_results(draft_results, registry)
+    os.makedirs(directory, exist_ok=True)
+    if file_format == 'parquet':
+        write_parquet_field(directory, draft_results, registry)
+    else:
+        save_players(directory, registry)
+        for name in ROSTER_ARRAYS:
+            # Team labels read from a CSV are Python strings, stored fixed-width so they can be memory-mapped
+            value = getattr(draft_results, name)
+            np.save(os.path.join(directory, f'{name}.npy'), value.astype(str) if value.dtype == object else value)
+    write_metadata(directory, file_format, len(draft_results.teams), draft_results.player_ids.shape[1],
+                   draft_results.position_names, draft_results.nfl_team_names)
+
+# Function to stream DraftResults chunks (e.g. FieldGenerator.batches) into a stored npy field of num_teams rosters
+# without holding the whole field in memory. Every chunk's player ids must index registry and share its label tables
+def write_field_batches(directory, batches, num_teams, registry, team_label_width=None):
+    os.makedirs(directory, exist_ok=True)
+    save_players(directory, registry)
+    arrays = None
+    start = 0
+    for chunk in batches:
+        if arrays is None:
+            roster_size = chunk.player_ids.shape[1]
+            width = max(team_label_width or 0, chunk.teams.dtype.itemsize // 4, len(f'Team {num_teams}'))
+            dtypes = {'player_ids': np.int32, 'position_ids': np.int8, 'nfl_team_ids': np.int16, 'teams': f'U{width}', 'pods': np.int32}
+            arrays = {name: np.lib.format.open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+', dtype=dtypes[name],
+                                                      shape=(num_teams, roster_size) if name.endswith('_ids') else (num_teams,))
+                      for name in ROSTER_ARRAYS}
+            write_metadata(directory, 'npy', num_teams, roster_size, chunk.position_names, chunk.nfl_team_names)
+        end = start + len(chunk.teams)
+        for name, array in arrays.items():
+            array[start:end] = getattr(chunk, name)
+        start = end
+    if start != num_teams:
+        raise ValueError(f"Expected {num_teams} teams, the batches held {start}")
+    for array in arrays.values():
+        array.flush()
+
+# Function to open a stored field, returns (DraftResults, PlayerRegistry) with player ids indexing the registry.
+# npy arrays are memory-mapped unless mmap_mode is None
+def load_field(directory, mmap_mode='r'):
+    metadata = read_metadata(directory)
+    if metadata['format'] == 'parquet':
+        registry, arrays = read_parquet_field(directory, metadata)
+    else:
+        registry = load_players(directory, mmap_mode)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in ROSTER_ARRAYS}
+    draft_results = DraftResults(player_names=registry.names, position_names=np.array(metadata['position_names'], dtype=str),
+                                 nfl_team_names=np.array(metadata['nfl_team_names'], dtype=str), **arrays)
+    return draft_results, registry
+
+# Function to write the player table and rosters as two Parquet files, one column per roster slot
+def write_parquet_field(directory, draft_results, registry):
+    pyarrow = import_pyarrow()
+    players = pyarrow.table({'player_name': registry.names, 'proj': registry.proj, 'projsd': registry.projsd})
+    pyarrow.parquet.write_table(players, os.path.join(directory, 'players.parquet'))
+    columns = {'team': draft_results.teams.astype(str), 'pod': draft_results.pods}
+    for slot in range(draft_results.player_ids.shape[1]):
+        columns[f'player_{slot + 1}'] = draft_results.player_ids[:, slot]
+        columns[f'position_{slot + 1}'] = draft_results.position_ids[:, slot]
+        columns[f'nfl_team_{slot + 1}'] = draft_results.nfl_team_ids[:, slot]
+    pyarrow.parquet.write_table(pyarrow.table(columns), os.path.join(directory, 'rosters.parquet'))
+
+# Function to read a Parquet field through pyarrow's memory map, returns the registry and the roster arrays
+def read_parquet_field(directory, metadata):
+    pyarrow = import_pyarrow()
+    players = pyarrow.parquet.read_table(os.path.join(directory, 'players.parquet'), memory_map=True)
+    registry = PlayerRegistry(players['player_name'].to_numpy(zero_copy_only=False).astype(str), players['proj'].to_numpy(), players['projsd'].to_numpy())
+    rosters = pyarrow.parquet.read_table(os.path.join(directory, 'rosters.parquet'), memory_map=True)
+    slots = range(1, metadata['roster_size'] + 1)
+
+    def stack(prefix, dtype):
+        return np.stack([rosters[f'{prefix}_{slot}'].to_numpy() for slot in slots], axis=1).astype(dtype)
+
+    arrays = {'player_ids': stack('player', np.int32), 'position_ids': stack('position', np.int8), 'nfl_team_ids': stack('nfl_team', np.int16),
+              'teams': rosters['team'].to_numpy(zero_copy_only=False).astype(str), 'pods': rosters['pod'].to_numpy().astype(np.int32)}
+    return registry, arrays
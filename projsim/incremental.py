@@ -0,0 +1,79 @@
+import numpy as np
+from .payouts import DEFAULT_PAYOUTS
+from .simulation import (
+    FactorCache, PlayerRegistry, as_player_registry, build_simulation_model, create_accumulator, index_draft_results,
+    plan_simulation_batches, settle_batch, summarize_results,
+)
+
+# A seeded simulation that keeps its draws so projection edits re-run in seconds. Every sim's unit-variance
+# correlated normals are kept (per rostered player in 'global' mode, per roster slot in 'roster' mode, stored as
+# unit_dtype) together with the (sims x teams) total points. Changing players' proj/projsd only recomputes the
+# totals of the teams rostering them and re-ranks and re-pays the sims; nothing is resampled. In 'global' mode the
+# results are bit-identical to simulate_team_outcomes with the same seed and the new projections; 'roster' mode
+# matches it to rounding. Memory is sims x teams x 8 bytes for the totals plus the kept draws, which in 'roster'
+# mode is sims x teams x 6 x unit_dtype
+class IncrementalSimulation:
+    def __init__(self, draft_results, projection_lookup, num_simulations, correlation='global', seed=None, payout_table=None,
+                 by_pod=False, top_n=10, histogram_bins=128, batch_size=256, factor_cache=None, unit_dtype=None):
+        registry = as_player_registry(projection_lookup)
+        # A private copy of proj/projsd, so edits never leak into the caller's registry
+        self.registry = PlayerRegistry(registry.names, registry.proj.copy(), registry.projsd.copy())
+        self.draft_results = index_draft_results(draft_results, self.registry)
+        self.model = build_simulation_model(self.draft_results, self.registry, correlation, factor_cache or FactorCache())
+        self.payout_table = payout_table or DEFAULT_PAYOUTS
+        self.pods = self.draft_results.pods if by_pod else None
+        self.top_n = top_n
+        self.histogram_bins = histogram_bins
+        self.seed = np.random.SeedSequence().entropy if seed is None else seed
+        self.batches = plan_simulation_batches(num_simulations, batch_size, self.seed)
+
+        num_teams = len(self.draft_results.teams)
+        if unit_dtype is None:
+            unit_dtype = np.float64 if correlation == 'global' else np.float32
+        self.units = None
+        self.total_points = np.empty((num_simulations, num_teams))
+        all_teams = np.arange(num_teams)
+        start = 0
+        for num_batch, rng in self.batches:
+            units = self.model.sample_units(num_batch, rng)
+            if self.units is None:
+                self.units = np.empty((num_simulations,) + units.shape[1:], dtype=unit_dtype)
+            self.units[start:start + num_batch] = units
+            self.total_points[start:start + num_batch] = self.model.totals_from_units(self.units[start:start + num_batch], all_teams)
+            start += num_batch
+        self.accumulator = self.settle()
+
+    # Function to rank and pay every kept sim at the current totals into a fresh accumulator, batch by batch
+    def settle(self):
+        accumulator = create_accumulator(self.model, self.top_n, self.histogram_bins)
+        start = 0
+        for num_batch, _ in self.batches:
+            settle_batch(self.total_points[start:start + num_batch], self.payout_table, accumulator, self.pods)
+            start += num_batch
+        return accumulator
+
+    # Function to apply projection changes, a dict of player name -> {'proj': ..., 'projsd': ...} (either key may be
+    # left out) or (proj, projsd). Recomputes the affected teams' totals from the kept draws and re-settles every
+    # sim. Returns the updated accumulator
+    def update(self, changes):
+        for name, change in changes.items():
+            if not isinstance(change, dict):
+                change = dict(zip(('proj', 'projsd'), change))
+            i = self.registry.index[name]
+            self.registry.proj[i] = change.get('proj', self.registry.proj[i])
+            self.registry.projsd[i] = change.get('projsd', self.registry.projsd[i])
+        self.model.refresh(self.registry)
+
+        changed = self.registry.ids(list(changes))
+        teams = np.flatnonzero(np.isin(self.draft_results.player_ids, changed).any(axis=1))
+        if len(teams):
+            start = 0
+            for num_batch, _ in self.batches:
+                self.total_points[start:start + num_batch, teams] = self.model.totals_from_units(self.units[start:start + num_batch], teams)
+                start += num_batch
+        self.accumulator = self.settle()
+        return self.accumulator
+
+    # Function to return the current results table, as run_parallel_simulations does
+    def results(self):
+        return summarize_results(self.draft_results, self.accumulator)
@@ -0,0 +1,114 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# No-op stand-in used when profiling is off, so the simulation loop calls the same hooks either way
+class NullProfiler:
+    enabled = False
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def count(self, name, value=1):
+        pass
+
+    def wrap_rng(self, rng):
+        return rng
+
+    def record_batch(self, num_batch, sims_done, num_simulations):
+        pass
+
+    def merge(self, other):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+# Times normal() calls of a wrapped RNG under the 'random' stage
+class _TimedRandom:
+    def __init__(self, rng, profiler):
+        self.rng = rng
+        self.profiler = profiler
+
+    def normal(self, size):
+        with self.profiler.stage('random'):
+            return self.rng.normal(size=size)
+
+# Per-stage timers and counters for a simulation run. Stages are timed once per batch, never per sim or per team,
+# so the cost stays far below the batch work. 'random' is the part of 'sample' spent drawing normals. Stages run
+# in worker processes are summed over workers. progress, if given, is called as progress(sims_done, num_simulations)
+# after every merged batch
+class SimulationProfiler:
+    enabled = True
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.batches = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            self.calls[name] += 1
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def wrap_rng(self, rng):
+        return _TimedRandom(rng, self)
+
+    # Function to log one merged batch to the trace and report progress
+    def record_batch(self, num_batch, sims_done, num_simulations):
+        self.counters['sims'] += num_batch
+        self.counters['batches'] += 1
+        self.batches.append({'batch': len(self.batches), 'sims': num_batch, 'sims_done': sims_done,
+                             'elapsed_seconds': time.perf_counter() - self.started})
+        if self.progress is not None:
+            self.progress(sims_done, num_simulations)
+
+    # Function to add the stage timings and counters collected by another profiler, e.g. in a worker process
+    def merge(self, other):
+        if other is None:
+            return
+        for name, seconds in other.seconds.items():
+            self.seconds[name] += seconds
+            self.calls[name] += other.calls[name]
+        for name, value in other.counters.items():
+            self.counters[name] += value
+
+    def __getstate__(self):
+        # The progress callback stays in the parent process
+        return {**vars(self), 'progress': None}
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        sims = self.counters.get('sims', 0)
+        batch_sizes = [batch['sims'] for batch in self.batches]
+        return {
+            'elapsed_seconds': elapsed,
+            'sims_per_sec': sims / elapsed if elapsed > 0 else 0.0,
+            'stages': {name: {'seconds': self.seconds[name], 'calls': self.calls[name]} for name in self.seconds},
+            'counters': dict(self.counters),
+            'batch_size': {'min': min(batch_sizes), 'max': max(batch_sizes), 'mean': sum(batch_sizes) / len(batch_sizes)} if batch_sizes else {},
+        }
+
+    # Function to write the summary and per-batch trace as JSON
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({**self.summary(), 'batches': self.batches}, f, indent=2)
+
+    # Function to write the per-batch trace as CSV, one row per merged batch
+    def to_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['batch', 'sims', 'sims_done', 'elapsed_seconds'])
+            writer.writeheader()
+            writer.writerows(self.batches)
@@ -0,0 +1,180 @@
+import csv
+import numpy as np
+
+# Contest payout structure stored as a table of rank ranges: ranks min_ranks[i]..max_ranks[i] pay amounts[i].
+# ties='split' shares the payouts of the ranks a group of tied teams spans equally, ties='rank' pays by sort order
+class PayoutTable:
+    def __init__(self, min_ranks, max_ranks, amounts, ties='split'):
+        order = np.argsort(min_ranks)
+        self.min_ranks = np.asarray(min_ranks, dtype=np.int64)[order]
+        self.max_ranks = np.asarray(max_ranks, dtype=np.int64)[order]
+        self.amounts = np.asarray(amounts, dtype=np.float64)[order]
+
+        if ties not in ('split', 'rank'):
+            raise ValueError(f"Unknown tie rule: {ties}")
+        if (self.min_ranks < 1).any() or (self.max_ranks < self.min_ranks).any():
+            raise ValueError("Payout ranges must satisfy 1 <= min_rank <= max_rank")
+        if (self.min_ranks[1:] <= self.max_ranks[:-1]).any():
+            raise ValueError("Payout ranges must not overlap")
+        self.ties = ties
+
+    # Build a table from a dict keyed by rank (1), rank range tuple ((7, 8)) or range string ("11-15")
+    @classmethod
+    def from_dict(cls, payouts, ties='split'):
+        min_ranks, max_ranks, amounts = [], [], []
+        for key, amount in payouts.items():
+            if isinstance(key, str):
+                low, _, high = key.partition('-')
+                low, high = int(low), int(high or low)
+            elif isinstance(key, tuple):
+                low, high = key
+            else:
+                low = high = key
+            min_ranks.append(low)
+            max_ranks.append(high)
+            amounts.append(amount)
+        return cls(min_ranks, max_ranks, amounts, ties)
+
+    # Build a table from a CSV with min_rank,max_rank,payout columns (or rank,payout for single ranks)
+    @classmethod
+    def from_csv(cls, path, ties='split'):
+        min_ranks, max_ranks, amounts = [], [], []
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if 'rank' in row:
+                    low = high = int(row['rank'])
+                else:
+                    low, high = int(row['min_rank']), int(row['max_rank'])
+                min_ranks.append(low)
+                max_ranks.append(high)
+                amounts.append(float(row['payout']))
+        return cls(min_ranks, max_ranks, amounts, ties)
+
+    # Highest rank that receives a payout
+    @property
+    def last_paid_rank(self):
+        return int(self.max_ranks[-1]) if len(self.max_ranks) else 0
+
+    # Function to return the ranks k where the payout drops, pay(k) > pay(k + 1), and the size of each drop. A team
+    # is paid the sum of the drops at every k it finishes at or above
+    def drops(self):
+        ranks = np.arange(1, self.last_paid_rank + 2)
+        drops = -np.diff(self.lookup(ranks))
+        return ranks[:-1][drops != 0], drops[drops != 0]
+
+    # Function to map an array of ranks of any shape to payouts with one searchsorted and gather
+    def lookup(self, ranks):
+        ranks = np.asarray(ranks)
+        if len(self.max_ranks) == 0:
+            return np.zeros(ranks.shape)
+        index = np.searchsorted(self.max_ranks, ranks, side='left')
+        in_table = index < len(self.max_ranks)
+        index = np.minimum(index, len(self.max_ranks) - 1)
+        paid = in_table & (ranks >= self.min_ranks[index])
+        return np.where(paid, self.amounts[index], 0.0)
+
+    # Function to sort a (sims x teams) matrix of total points into finishing order. Ties are broken by team index,
+    # lower first. With pods (an integer pod code per team) every pod is ranked on its own, otherwise the whole field
+    # is one contest. Returns the order, the rank of each sorted position and the pod of each sorted position (None
+    # without pods). When only the best depth ranks matter (never fewer than the paid ranks) and the field is
+    # larger, the order only covers those teams and any ties with them; everyone else finishes outside it
+    def rank(self, total_points, pods=None, depth=None):
+        num_teams = total_points.shape[1]
+        if pods is not None:
+            # A stable sort by pod keeps the points order inside each pod, and leaves the pods in the same
+            # sorted layout for every sim, so ranks within a pod are one shared vector
+            order = np.argsort(-total_points, axis=1, kind='stable')
+            order = np.take_along_axis(order, pods[order].argsort(axis=1, kind='stable'), axis=1)
+            sorted_pods = np.sort(pods)
+            return order, np.arange(num_teams) - np.searchsorted(sorted_pods, sorted_pods, side='left') + 1, sorted_pods
+
+        depth = max(self.last_paid_rank, depth or 0, 1)
+        order = top_k_order(total_points, depth)
+        return order, np.arange(1, order.shape[1] + 1), None
+
+    # Function to pay the teams of a ranking returned by rank(). return_ranks=True also returns each team's
+    # finishing rank, tied teams sharing the best rank of their group. Teams outside a partial order are paid
+    # nothing and get the rank just past it
+    def pay(self, total_points, ranking, return_ranks=False):
+        num_sims = total_points.shape[0]
+        order, ranks, sorted_pods = ranking
+        num_ranked = order.shape[1]
+        sorted_payouts = np.broadcast_to(self.lookup(ranks), (num_sims, num_ranked))
+        sorted_ranks = np.broadcast_to(ranks, (num_sims, num_ranked))
+
+        if self.ties == 'split':
+            sorted_points = np.take_along_axis(total_points, order, axis=1)
+            new_group = np.ones((num_sims, num_ranked), dtype=bool)
+            new_group[:, 1:] = sorted_points[:, 1:] != sorted_points[:, :-1]
+            if sorted_pods is not None:
+                new_group[:, 1:] |= sorted_pods[1:] != sorted_pods[:-1]
+            if not new_group.all():
+                # Every row starts a new group, so one cumsum numbers the tie groups across the whole batch
+                group = np.cumsum(new_group.ravel()) - 1
+                group_payouts = np.bincount(group, weights=sorted_payouts.ravel()) / np.bincount(group)
+                sorted_payouts = group_payouts[group].reshape(num_sims, num_ranked)
+                if return_ranks:
+                    group_start = np.flatnonzero(new_group.ravel())
+                    sorted_ranks = sorted_ranks.ravel()[group_start[group]].reshape(num_sims, num_ranked)
+
+        payouts = np.zeros(total_points.shape)
+        np.put_along_axis(payouts, order, sorted_payouts, axis=1)
+        if not return_ranks:
+            return payouts
+        team_ranks = np.full(total_points.shape, num_ranked + 1, dtype=np.int64)
+        np.put_along_axis(team_ranks, order, sorted_ranks, axis=1)
+        return payouts, team_ranks
+
+    # Function to rank and pay a (sims x teams) matrix of total points in one call, see rank() and pay()
+    def apply(self, total_points, pods=None, return_ranks=False):
+        return self.pay(total_points, self.rank(total_points, pods), return_ranks)
+
+# Function to find at least the best k teams of every sim, in finishing order with ties broken by lower team index.
+# The order is widened to every team scoring at least some sim's k-th best total, so a tie group at the cut is
+# always ranked whole. argpartition picks those candidates in linear time and only that slice is sorted. A tie group
+# cut off past position k starts below the k-th best and is left partial. Falls back to a full sort once the
+# width covers the field
+def top_k_order(total_points, k):
+    num_teams = total_points.shape[1]
+    negated = -total_points
+    if k >= num_teams:
+        return np.argsort(negated, axis=1, kind='stable')
+    partitioned = np.argpartition(negated, k - 1, axis=1)
+    cut = np.take_along_axis(negated, partitioned[:, k - 1:k], axis=1)
+    width = int((negated <= cut).sum(axis=1).max())
+    if width >= num_teams:
+        return np.argsort(negated, axis=1, kind='stable')
+    if width > k:
+        partitioned = np.argpartition(negated, width - 1, axis=1)
+    candidates = np.sort(partitioned[:, :width], axis=1)
+    candidate_points = np.take_along_axis(negated, candidates, axis=1)
+    return np.take_along_axis(candidates, np.argsort(candidate_points, axis=1, kind='stable'), axis=1)
+
+# Function to fingerprint a payout table's ranges, amounts and tie rule
+def payout_version(payout_table):
+    import hashlib
+    digest = hashlib.sha1(payout_table.ties.encode())
+    for array in (payout_table.min_ranks, payout_table.max_ranks, payout_table.amounts):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+# Payout structure previously hard-coded in get_payout
+DEFAULT_PAYOUTS = PayoutTable.from_dict({
+    1: 20000.00,
+    2: 6000.00,
+    3: 3000.00,
+    4: 1500.00,
+    5: 1000.00,
+    6: 500.00,
+    '7-8': 250.00,
+    '9-10': 200.00,
+    '11-15': 175.00,
+    '16-20': 150.00,
+    '21-25': 125.00,
+    '26-35': 100.00,
+    '36-45': 75.00,
+    '46-70': 60.00,
+    '71-130': 50.00,
+    '131-250': 40.00,
+    '251-710': 30.00,
+})
@@ -0,0 +1,815 @@
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .accumulators import MERGE_BLOCK, OutcomeAccumulator
+from .checkpoint import encode_seed, load_checkpoint, save_checkpoint
+from .instrumentation import NULL_PROFILER, SimulationProfiler
+from .payouts import DEFAULT_PAYOUTS, payout_version
+
+# Define player projections and standard deviations
+projections = {
+    "Christian McCaffrey": {'proj': 30, 'projsd': 9},
+    "CeeDee Lamb": {'proj': 29, 'projsd': 9},
+    "Tyreek Hill": {'proj': 28, 'projsd': 9},
+    "Ja'Marr Chase": {'proj': 27, 'projsd': 9},
+    "Justin Jefferson": {'proj': 26, 'projsd': 9},
+    "Amon-Ra St. Brown": {'proj': 25, 'projsd': 8},
+    "Bijan Robinson": {'proj': 24, 'projsd': 8},
+    "Breece Hall": {'proj': 23, 'projsd': 8},
+    "A.J. Brown": {'proj': 22, 'projsd': 8},
+    "Puka Nacua": {'proj': 21, 'projsd': 8},
+    "Garrett Wilson": {'proj': 20, 'projsd': 7},
+    "Jahmyr Gibbs": {'proj': 19, 'projsd': 7},
+    "Marvin Harrison": {'proj': 18, 'projsd': 7},
+    "Drake London": {'proj': 17, 'projsd': 7},
+    "Jonathan Taylor": {'proj': 16, 'projsd': 7},
+    "Nico Collins": {'proj': 15, 'projsd': 7},
+    "Chris Olave": {'proj': 14, 'projsd': 6},
+    "Deebo Samuel": {'proj': 13, 'projsd': 6},
+    "Saquon Barkley": {'proj': 12, 'projsd': 6},
+    "Jaylen Waddle": {'proj': 11, 'projsd': 6},
+    "Davante Adams": {'proj': 10, 'projsd': 6},
+    "Brandon Aiyuk": {'proj': 9, 'projsd': 6},
+    "De'Von Achane": {'proj': 8, 'projsd': 5},
+    "Mike Evans": {'proj': 7, 'projsd': 5},
+    "DeVonta Smith": {'proj': 6, 'projsd': 5},
+    "DK Metcalf": {'proj': 6, 'projsd': 5},
+    "Malik Nabers": {'proj': 6, 'projsd': 4},
+    "Cooper Kupp": {'proj': 6, 'projsd': 4},
+    "Kyren Williams": {'proj': 6, 'projsd': 4},
+    "Derrick Henry": {'proj': 6, 'projsd': 4},
+    "DJ Moore": {'proj': 6, 'projsd': 3},
+    "Stefon Diggs": {'proj': 6, 'projsd': 3},
+    "Michael Pittman Jr.": {'proj': 6, 'projsd': 3},
+    "Tank Dell": {'proj': 6, 'projsd': 3},
+    "Sam LaPorta": {'proj': 6, 'projsd': 3},
+    "Zay Flowers": {'proj': 6, 'projsd': 3},
+    "Josh Allen": {'proj': 6, 'projsd': 3},
+    "Travis Kelce": {'proj': 6, 'projsd': 3},
+    "George Pickens": {'proj': 6, 'projsd': 3},
+    "Isiah Pacheco": {'proj': 6, 'projsd': 3},
+    "Amari Cooper": {'proj': 6, 'projsd': 3},
+    "Jalen Hurts": {'proj': 6, 'projsd': 3},
+    "Tee Higgins": {'proj': 6, 'projsd': 3},
+    "Travis Etienne Jr.": {'proj': 6, 'projsd': 3},
+    "Patrick Mahomes": {'proj': 6, 'projsd': 3},
+    "Christian Kirk": {'proj': 6, 'projsd': 3},
+    "Trey McBride": {'proj': 6, 'projsd': 3},
+    "Lamar Jackson": {'proj': 6, 'projsd': 3},
+    "Mark Andrews": {'proj': 6, 'projsd': 3},
+    "Terry McLaurin": {'proj': 6, 'projsd': 3},
+    "Dalton Kincaid": {'proj': 6, 'projsd': 3},
+    "Josh Jacobs": {'proj': 6, 'projsd': 3},
+    "Hollywood Brown": {'proj': 6, 'projsd': 3},
+    "Keenan Allen": {'proj': 6, 'projsd': 3},
+    "James Cook": {'proj': 6, 'projsd': 3},
+    "Anthony Richardson": {'proj': 6, 'projsd': 3},
+    "Jayden Reed": {'proj': 6, 'projsd': 3},
+    "Calvin Ridley": {'proj': 6, 'projsd': 3},
+    "Chris Godwin": {'proj': 6, 'projsd': 3},
+    "Rashee Rice": {'proj': 6, 'projsd': 3},
+    "Keon Coleman": {'proj': 6, 'projsd': 3},
+    "Kyler Murray": {'proj': 6, 'projsd': 3},
+    "Aaron Jones": {'proj': 6, 'projsd': 3},
+    "DeAndre Hopkins": {'proj': 6, 'projsd': 3},
+    "Rhamondre Stevenson": {'proj': 6, 'projsd': 3},
+    "James Conner": {'proj': 6, 'projsd': 3},
+    "Najee Harris": {'proj': 6, 'projsd': 3},
+    "Jameson Williams": {'proj': 6, 'projsd': 3},
+    "Jake Ferguson": {'proj': 6, 'projsd': 3},
+    "Jordan Addison": {'proj': 6, 'projsd': 3},
+    "Curtis Samuel": {'proj': 6, 'projsd': 3},
+    "Jaylen Warren": {'proj': 6, 'projsd': 3},
+    "Zamir White": {'proj': 6, 'projsd': 3},
+    "Joe Burrow": {'proj': 6, 'projsd': 3},
+    "Jonathon Brooks": {'proj': 6, 'projsd': 3},
+    "D'Andre Swift": {'proj': 6, 'projsd': 3},
+    "Raheem Mostert": {'proj': 6, 'projsd': 3},
+    "Dak Prescott": {'proj': 6, 'projsd': 3},
+    "Courtland Sutton": {'proj': 6, 'projsd': 3},
+    "Brock Bowers": {'proj': 6, 'projsd': 3},
+    "Jordan Love": {'proj': 6, 'projsd': 3},
+    "Zack Moss": {'proj': 6, 'projsd': 3},
+    "Joshua Palmer": {'proj': 6, 'projsd': 3},
+    "David Njoku": {'proj': 6, 'projsd': 3},
+    "Tony Pollard": {'proj': 6, 'projsd': 3},
+    "Jayden Daniels": {'proj': 6, 'projsd': 3},
+    "Brian Robinson Jr.": {'proj': 6, 'projsd': 3},
+    "Romeo Doubs": {'proj': 6, 'projsd': 3},
+    "Rashid Shaheed": {'proj': 6, 'projsd': 3},
+    "Tyler Lockett": {'proj': 6, 'projsd': 3},
+    "Tyjae Spears": {'proj': 6, 'projsd': 3},
+    "Chase Brown": {'proj': 6, 'projsd': 3},
+    "Devin Singletary": {'proj': 6, 'projsd': 3},
+    "Khalil Shakir": {'proj': 6, 'projsd': 3},
+    "Brock Purdy": {'proj': 6, 'projsd': 3},
+    "Javonte Williams": {'proj': 6, 'projsd': 3},
+    "Caleb Williams": {'proj': 6, 'projsd': 3},
+    "Dontayvion Wicks": {'proj': 6, 'projsd': 3},
+    "Brandin Cooks": {'proj': 6, 'projsd': 3},
+    "Dallas Goedert": {'proj': 6, 'projsd': 3},
+    "Trey Benson": {'proj': 6, 'projsd': 3},
+    "Trevor Lawrence": {'proj': 6, 'projsd': 3},
+    "Gus Edwards": {'proj': 6, 'projsd': 3},
+    "Jakobi Meyers": {'proj': 6, 'projsd': 3},
+    "Blake Corum": {'proj': 6, 'projsd': 3},
+    "Ezekiel Elliott": {'proj': 6, 'projsd': 3},
+    "Jerry Jeudy": {'proj': 6, 'projsd': 3},
+    "Tua Tagovailoa": {'proj': 6, 'projsd': 3},
+    "Jared Goff": {'proj': 6, 'projsd': 3},
+    "Adonai Mitchell": {'proj': 6, 'projsd': 3},
+    "Jerome Ford": {'proj': 6, 'projsd': 3},
+    "Nick Chubb": {'proj': 6, 'projsd': 3},
+    "Ja'Lynn Polk": {'proj': 6, 'projsd': 3},
+    "Pat Freiermuth": {'proj': 6, 'projsd': 3},
+    "Austin Ekeler": {'proj': 6, 'projsd': 3},
+    "Dalton Schultz": {'proj': 6, 'projsd': 3}
+}
+# Convert projections dictionary to a NumPy structured array, built on first access (see __getattr__)
+proj_dtype = np.dtype([('player_name', 'U50'), ('proj', 'f4'), ('projsd', 'f4')])
+
+def build_projections_array():
+    return np.array([(name, projections[name]['proj'], projections[name]['projsd']) for name in projections], dtype=proj_dtype)
+
+# Registry of projected players: names map to dense int32 ids once, with contiguous float32 proj/projsd arrays
+# so the sampling path is pure array indexing
+class PlayerRegistry:
+    def __init__(self, names, proj, projsd):
+        self.names = np.asarray(names, dtype=str)
+        self.proj = np.ascontiguousarray(proj, dtype=np.float32)
+        self.projsd = np.ascontiguousarray(projsd, dtype=np.float32)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    # Build a registry from a projections dict, values are {'proj': ..., 'projsd': ...} or (proj, projsd)
+    @classmethod
+    def from_projections(cls, projection_lookup):
+        names = list(projection_lookup)
+        values = [projection_lookup[name] for name in names]
+        if values and isinstance(values[0], dict):
+            values = [(value['proj'], value['projsd']) for value in values]
+        proj, projsd = zip(*values) if values else ((), ())
+        return cls(names, proj, projsd)
+
+    def __len__(self):
+        return len(self.names)
+
+    # Function to map player names to ids, raises KeyError for players without a projection
+    def ids(self, names):
+        return np.fromiter((self.index[name] for name in names), dtype=np.int32, count=len(names))
+
+# Function to accept either a PlayerRegistry or a projections dict wherever a projection lookup is expected
+def as_player_registry(projection_lookup):
+    if isinstance(projection_lookup, PlayerRegistry):
+        return projection_lookup
+    return PlayerRegistry.from_projections(projection_lookup)
+
+# Kernel to generate projection, JIT compiled as generate_projection
+def _generate_projection(median, std_dev):
+    fluctuation = np.random.uniform(-0.01, 0.01) * median
+    return max(0, np.random.normal(median, std_dev) + fluctuation)
+
+# Kernel to get payout based on rank, JIT compiled as get_payout
+def _get_payout(rank):
+    if rank == 1:
+        return 20000.00
+    elif rank == 2:
+        return 6000.00
+    elif rank == 3:
+        return 3000.00
+    elif rank == 4:
+        return 1500.00
+    elif rank == 5:
+        return 1000.00
+    elif rank == 6:
+        return 500.00
+    elif rank in [7, 8]:
+        return 250.00
+    elif rank in [9, 10]:
+        return 200.00
+    elif rank in range(11, 16):
+        return 175.00
+    elif rank in range(16, 21):
+        return 150.00
+    elif rank in range(21, 26):
+        return 125.00
+    elif rank in range(26, 36):
+        return 100.00
+    elif rank in range(36, 46):
+        return 75.00
+    elif rank in range(46, 71):
+        return 60.00
+    elif rank in range(71, 131):
+        return 50.00
+    elif rank in range(131, 251):
+        return 40.00
+    elif rank in range(251, 711):
+        return 30.00
+    else:
+        return 0
+
+# numba kernels by public name. numba is only imported when a kernel is first used, and cache=True keeps the
+# compiled machine code on disk so later processes load it instead of compiling again
+_KERNELS = {'generate_projection': _generate_projection, 'get_payout': _get_payout}
+_compiled_kernels = {}
+
+# Function to return a numba kernel, compiling it (or loading it from the disk cache) on first use
+def jit_kernel(name):
+    if name not in _compiled_kernels:
+        from numba import jit
+        _compiled_kernels[name] = jit(nopython=True, cache=True)(_KERNELS[name])
+    return _compiled_kernels[name]
+
+# Module attributes that cost import or build time are created when first accessed: the numba kernels and
+# projections_array
+def __getattr__(name):
+    if name in _KERNELS:
+        return jit_kernel(name)
+    if name == 'projections_array':
+        globals()[name] = build_projections_array()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Function to do the one-off startup work ahead of time: import pandas and scipy.linalg and compile (or load from
+# the disk cache) the numba kernels. Call it in a long-lived process, or once in the parent before forking
+# workers, so the first real run does not pay for it
+def warm_up(kernels=True):
+    import pandas
+    import scipy.linalg
+    if kernels:
+        jit_kernel('get_payout')(1)
+        jit_kernel('generate_projection')(20.0, 5.0)
+
+# Rosters as integer codes into the player, position and NFL-team label tables. pods holds a contest/pod code
+# per team taken from the Simulation column (all zeros when the column is missing)
+DraftResults = namedtuple('DraftResults', ['player_ids', 'position_ids', 'nfl_team_ids', 'player_names', 'position_names', 'nfl_team_names', 'teams', 'pods'])
+
+# Function to prepare draft results in numpy array format with one vectorized pass over the Player_i_* columns.
+# With a registry, player ids index the registry instead of the file's own name table
+def prepare_draft_results(draft_results_df, registry=None):
+    import pandas as pd
+    draft_results_df = draft_results_df.drop_duplicates('Team')
+    num_teams = len(draft_results_df)
+
+    def encode(field, dtype):
+        values = draft_results_df[[f'Player_{i}_{field}' for i in range(1, 7)]].to_numpy().ravel()
+        codes, labels = pd.factorize(values)
+        return codes.astype(dtype).reshape(num_teams, 6), np.asarray(labels, dtype=str)
+
+    player_ids, player_names = encode('Name', np.int32)
+    position_ids, position_names = encode('Position', np.int8)
+    nfl_team_ids, nfl_team_names = encode('Team', np.int16)
+    if 'Simulation' in draft_results_df:
+        pods = pd.factorize(draft_results_df['Simulation'])[0].astype(np.int32)
+    else:
+        pods = np.zeros(num_teams, dtype=np.int32)
+
+    teams = draft_results_df['Team'].to_numpy()
+    draft_results = DraftResults(player_ids, position_ids, nfl_team_ids, player_names, position_names, nfl_team_names, teams, pods)
+    if registry is not None:
+        draft_results = index_draft_results(draft_results, registry)
+    return draft_results
+
+# Function to re-code a DraftResults so its player ids index the registry, a no-op when they already do
+def index_draft_results(draft_results, registry):
+    if draft_results.player_names is registry.names:
+        return draft_results
+    player_ids = registry.ids(draft_results.player_names)[draft_results.player_ids]
+    return draft_results._replace(player_ids=player_ids, player_names=registry.names)
+
+# Function to feed integer codes into a fingerprint by the labels they use, so the fingerprint does not depend on
+# unused entries or the order of the label table
+def hash_codes(digest, codes, labels):
+    used, inverse = np.unique(codes, return_inverse=True)
+    digest.update('\0'.join(str(label) for label in labels[used]).encode())
+    digest.update(np.ascontiguousarray(inverse, dtype=np.int64).tobytes())
+
+# Function to fingerprint a field's rosters (players, positions, NFL teams and pods), e.g. to tell whether a loaded
+# field or the field of a checkpoint changed. The same rosters give the same fingerprint under any registry
+def field_version(draft_results):
+    import hashlib
+    digest = hashlib.sha1()
+    digest.update(np.asarray(draft_results.player_ids.shape, dtype=np.int64).tobytes())
+    hash_codes(digest, draft_results.player_ids, draft_results.player_names)
+    hash_codes(digest, draft_results.position_ids, draft_results.position_names)
+    hash_codes(digest, draft_results.nfl_team_ids, draft_results.nfl_team_names)
+    digest.update(np.ascontiguousarray(draft_results.pods, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+# Function to fingerprint a registry's names and proj/projsd values, only those of player_ids when given (e.g. the
+# rostered players, so projections of players nobody drafted do not count)
+def projection_version(registry, player_ids=None):
+    import hashlib
+    players = np.arange(len(registry)) if player_ids is None else np.unique(player_ids)
+    digest = hashlib.sha1()
+    digest.update('\0'.join(str(name) for name in registry.names[players]).encode())
+    digest.update(np.ascontiguousarray(registry.proj[players]).tobytes())
+    digest.update(np.ascontiguousarray(registry.projsd[players]).tobytes())
+    return digest.hexdigest()
+
+# Function to create a simplified correlation matrix based on real-life NFL teams and positions
+def create_correlation_matrix(player_teams, player_positions):
+    num_players = player_teams.size
+    correlation_matrix = np.identity(num_players)
+    
+    for i in range(num_players):
+        for j in range(i + 1, num_players):
+            if player_teams.flat[i] == player_teams.flat[j]:
+                if player_positions.flat[i] == 'QB':
+                    if player_positions.flat[j] == 'WR':
+                        correlation_matrix[i, j] = 0.35
+                        correlation_matrix[j, i] = 0.35
+                    elif player_positions.flat[j] == 'TE':
+                        correlation_matrix[i, j] = 0.25
+                        correlation_matrix[j, i] = 0.25
+                    elif player_positions.flat[j] == 'RB':
+                        correlation_matrix[i, j] = 0.1
+                        correlation_matrix[j, i] = 0.1
+                elif player_positions.flat[j] == 'QB':
+                    if player_positions.flat[i] == 'WR':
+                        correlation_matrix[i, j] = 0.35
+                        correlation_matrix[j, i] = 0.35
+                    elif player_positions.flat[i] == 'TE':
+                        correlation_matrix[i, j] = 0.25
+                        correlation_matrix[j, i] = 0.25
+                    elif player_positions.flat[i] == 'RB':
+                        correlation_matrix[i, j] = 0.1
+                        correlation_matrix[j, i] = 0.1
+
+    return correlation_matrix
+
+# Function to generate correlated projections
+def generate_correlated_projections(player_names, player_positions, player_teams, projection_lookup, correlation_matrix):
+    num_players = len(player_names)
+    mean = np.array([projection_lookup[name][0] for name in player_names])
+    std_dev = np.array([projection_lookup[name][1] for name in player_names])
+
+    cov_matrix = np.outer(std_dev, std_dev) * correlation_matrix
+    from scipy.linalg import cholesky
+    L = cholesky(cov_matrix, lower=True)
+
+    random_normals = np.random.normal(size=num_players)
+    correlated_normals = np.dot(L, random_normals)
+    correlated_projections = mean + correlated_normals
+
+    return correlated_projections
+
+# Function to build a normalized stack signature for one roster. Only same-team pairs involving a QB are
+# correlated, so each slot keeps its position plus a relabeled NFL team for QB stacks and -1 for everyone else
+def stack_signature(player_teams, player_positions):
+    stacked_teams = {team for team, position in zip(player_teams, player_positions) if position == 'QB'}
+    team_counts = {}
+    for team in player_teams:
+        team_counts[team] = team_counts.get(team, 0) + 1
+
+    labels = {}
+    signature = []
+    for team, position in zip(player_teams, player_positions):
+        if team in stacked_teams and team_counts[team] > 1:
+            group = labels.setdefault(team, len(labels))
+        else:
+            group = -1
+        signature.append((str(position), group))
+    return tuple(signature)
+
+# Cache of correlation Cholesky factors shared by every roster with the same stack signature
+class FactorCache:
+    def __init__(self):
+        self.factors = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, player_teams, player_positions):
+        signature = stack_signature(player_teams, player_positions)
+        factor = self.factors.get(signature)
+        if factor is None:
+            from scipy.linalg import cholesky
+            self.misses += 1
+            factor = cholesky(create_correlation_matrix(player_teams, player_positions), lower=True)
+            self.factors[signature] = factor
+        else:
+            self.hits += 1
+        return factor
+
+    def stats(self):
+        return {'signatures': len(self.factors), 'hits': self.hits, 'misses': self.misses}
+
+# Function to look up every roster's unit-variance correlation factor, returns a (teams x slots x slots) array
+def prepare_unit_factors(draft_results, factor_cache=None):
+    if factor_cache is None:
+        factor_cache = FactorCache()
+    positions = draft_results.position_names[draft_results.position_ids]
+    unit_factors = np.empty(draft_results.player_ids.shape + draft_results.player_ids.shape[1:])
+    for i in range(len(unit_factors)):
+        unit_factors[i] = factor_cache.get(draft_results.nfl_team_ids[i], positions[i])
+    return unit_factors
+
+# Function to draw one batch of simulations for every team at once, returns (sims x teams) total points
+def simulate_batch_totals(means, factors, batch_size, rng=np.random):
+    random_normals = rng.normal(size=(batch_size,) + means.shape)
+    correlated_normals = np.einsum('tij,btj->bti', factors, random_normals)
+    return (means + correlated_normals).sum(axis=2)
+
+# Function to find each rostered player's position and NFL team from the roster slots he fills,
+# players nobody rostered get an empty position and NFL team -1
+def player_attributes(draft_results):
+    num_players = len(draft_results.player_names)
+    positions = np.full(num_players, '', dtype=draft_results.position_names.dtype)
+    nfl_teams = np.full(num_players, -1, dtype=draft_results.nfl_team_ids.dtype)
+    positions[draft_results.player_ids.ravel()] = draft_results.position_names[draft_results.position_ids.ravel()]
+    nfl_teams[draft_results.player_ids.ravel()] = draft_results.nfl_team_ids.ravel()
+    return positions, nfl_teams
+
+# Smallest eigenvalue an NFL team's global correlation block is shrunk to when the pairwise rule leaves it indefinite
+MIN_BLOCK_EIGENVALUE = 1e-3
+
+# Function to scale a correlation matrix's off-diagonal entries toward zero just enough that its smallest
+# eigenvalue becomes min_eigenvalue. The pairwise QB rule stops being a valid correlation matrix once enough pass
+# catchers share a QB, e.g. a QB with nine rostered WRs
+def shrink_correlation(correlation_matrix, min_eigenvalue=MIN_BLOCK_EIGENVALUE):
+    identity = np.identity(len(correlation_matrix))
+    off_diagonal = correlation_matrix - identity
+    lowest = np.linalg.eigvalsh(off_diagonal)[0]
+    return identity + off_diagonal * ((1 - min_eigenvalue) / -lowest)
+
+# Function to create the contest-wide correlation factor. Players only correlate within an NFL team, so the
+# matrix is block diagonal and each NFL team's block is factored on its own. A block the pairwise rule leaves
+# indefinite is shrunk first; every other block keeps the rule's correlations exactly
+def create_global_factor(player_positions, player_teams):
+    from scipy.linalg import cholesky
+    num_players = len(player_positions)
+    factor = np.zeros((num_players, num_players))
+    for team in np.unique(player_teams):
+        block = np.flatnonzero(player_teams == team)
+        correlation_matrix = create_correlation_matrix(player_teams[block], player_positions[block])
+        try:
+            factor[np.ix_(block, block)] = cholesky(correlation_matrix, lower=True)
+        except np.linalg.LinAlgError:
+            factor[np.ix_(block, block)] = cholesky(shrink_correlation(correlation_matrix), lower=True)
+    return factor
+
+# Per-roster correlation model: every roster slot gets its own draw from that roster's 6x6 block
+class RosterModel:
+    # The normals come in one block per team, (sims x teams x slots)
+    blockwise_normals = True
+
+    def __init__(self, draft_results, registry, factor_cache=None):
+        self.player_ids = draft_results.player_ids
+        self.unit_factors = prepare_unit_factors(draft_results, factor_cache)
+        self.refresh(registry)
+
+    # Function to pick up the registry's current proj/projsd values, e.g. after a projection change
+    def refresh(self, registry):
+        self.means = registry.proj[self.player_ids].astype(np.float64)
+        self.std_dev = registry.projsd[self.player_ids].astype(np.float64)
+        self.factors = self.std_dev[:, :, None] * self.unit_factors
+
+    def sample_totals(self, batch_size, rng=np.random):
+        return simulate_batch_totals(self.means, self.factors, batch_size, rng)
+
+    # Function to draw the unit-variance correlated normals of every roster slot, (sims x teams x slots)
+    def sample_units(self, batch_size, rng=np.random):
+        random_normals = rng.normal(size=(batch_size,) + self.means.shape)
+        return np.einsum('tij,btj->bti', self.unit_factors, random_normals)
+
+    # Function to turn unit normals from sample_units into (sims x len(teams)) total points at the current projections
+    def totals_from_units(self, units, teams):
+        return (self.means[teams] + self.std_dev[teams] * units[:, teams]).sum(axis=2)
+
+    # Function to return the mean and standard deviation of every team's total points
+    def total_moments(self):
+        return self.means.sum(axis=1), np.linalg.norm(self.total_directions(), axis=1)
+
+    # Function to return the gradient of every team's total points with respect to its own block of normals
+    def total_directions(self):
+        return self.factors.sum(axis=1)
+
+# Contest-wide correlation model: each rostered player is drawn once per sim and shared by every roster holding him
+class GlobalModel:
+    # The normals are shared by all teams, (sims x players)
+    blockwise_normals = False
+
+    def __init__(self, draft_results, registry):
+        rostered, roster_index = np.unique(draft_results.player_ids, return_inverse=True)
+        self.rostered = rostered
+        self.roster_index = roster_index.reshape(draft_results.player_ids.shape).astype(np.int32)
+        positions, nfl_teams = player_attributes(draft_results)
+        self.factor = create_global_factor(positions[rostered], nfl_teams[rostered])
+        self.refresh(registry)
+
+    # Function to pick up the registry's current proj/projsd values, e.g. after a projection change
+    def refresh(self, registry):
+        self.means = registry.proj[self.rostered].astype(np.float64)
+        self.std_dev = registry.projsd[self.rostered].astype(np.float64)
+
+    # Function to draw the unit-variance correlated normals of every rostered player, (sims x players)
+    def sample_units(self, batch_size, rng=np.random):
+        random_normals = rng.normal(size=(batch_size, len(self.means)))
+        # einsum rather than a BLAS matmul keeps each sim's result independent of how many sims share the batch
+        return np.einsum('bj,ij->bi', random_normals, self.factor)
+
+    def sample_players(self, batch_size, rng=np.random):
+        return self.means + self.sample_units(batch_size, rng) * self.std_dev
+
+    # Function to turn unit normals from sample_units into (sims x len(teams)) total points at the current
+    # projections, with the same arithmetic as sample_totals
+    def totals_from_units(self, units, teams):
+        roster_index = self.roster_index[teams]
+        total_points = None
+        for slot in range(roster_index.shape[1]):
+            index = roster_index[:, slot]
+            slot_points = self.means[index] + units[:, index] * self.std_dev[index]
+            total_points = slot_points if total_points is None else total_points + slot_points
+        return total_points
+
+    # Function to return the mean and standard deviation of every team's total points, summing the player
+    # covariance over each pair of roster slots
+    def total_moments(self):
+        scaled_factor = self.factor * self.std_dev[:, None]
+        covariance = scaled_factor @ scaled_factor.T
+        variance = np.zeros(len(self.roster_index))
+        for slot_a in range(self.roster_index.shape[1]):
+            for slot_b in range(self.roster_index.shape[1]):
+                variance += covariance[self.roster_index[:, slot_a], self.roster_index[:, slot_b]]
+        return self.means[self.roster_index].sum(axis=1), np.sqrt(variance)
+
+    # Function to return the gradient of every team's total points with respect to the players' normals
+    def total_directions(self):
+        directions = np.zeros((len(self.roster_index), len(self.means)))
+        for slot in range(self.roster_index.shape[1]):
+            index = self.roster_index[:, slot]
+            directions += self.std_dev[index][:, None] * self.factor[index]
+        return directions
+
+    def sample_totals(self, batch_size, rng=np.random):
+        player_points = self.sample_players(batch_size, rng)
+        # Sum slot by slot so the gather never materializes a (sims x teams x players) array
+        total_points = player_points[:, self.roster_index[:, 0]]
+        for slot in range(1, self.roster_index.shape[1]):
+            total_points += player_points[:, self.roster_index[:, slot]]
+        return total_points
+
+# Function to build the simulation model for a correlation mode, 'roster' or 'global'
+def build_simulation_model(draft_results, registry, correlation='roster', factor_cache=None):
+    if correlation == 'roster':
+        return RosterModel(draft_results, registry, factor_cache)
+    if correlation == 'global':
+        return GlobalModel(draft_results, registry)
+    raise ValueError(f"Unknown correlation mode: {correlation}")
+
+# Function to simulate one batch of sims and fold points, payouts and ranks into the accumulator,
+# ranked per pod when pods is given. Each step is timed as a profiler stage. reduction is a prepared
+# variance_reduction.ReductionPlan: with an importance sampler the sims are drawn from its mixture and weighted
+def simulate_batch(model, payout_table, batch_size, accumulator, rng=np.random, pods=None, profiler=NULL_PROFILER, reduction=None):
+    weights = None
+    with profiler.stage('sample'):
+        if reduction is not None:
+            rng = reduction.wrap_rng(rng)
+        total_points = model.sample_totals(batch_size, profiler.wrap_rng(rng))
+        if reduction is not None and reduction.weighted:
+            weights = rng.weights
+    return settle_batch(total_points, payout_table, accumulator, pods, profiler, weights, reduction)
+
+# Function to rank and pay one batch of (sims x teams) total points and fold the outcomes into the accumulator.
+# With a reduction plan the payouts may be replaced by conditional ones and control values are accumulated too
+def settle_batch(total_points, payout_table, accumulator, pods=None, profiler=NULL_PROFILER, weights=None, reduction=None):
+    depth = max(payout_table.last_paid_rank, accumulator.top_n)
+    if reduction is not None and reduction.conditional is not None:
+        depth = max(depth, reduction.conditional.depth)
+    with profiler.stage('rank'):
+        ranking = payout_table.rank(total_points, pods, depth=depth)
+    with profiler.stage('payout'):
+        payouts, ranks = payout_table.pay(total_points, ranking, return_ranks=True)
+        control_values = realized_payouts = None
+        if reduction is not None:
+            # Payout SD and cash rates describe the realized payouts even when the averaged ones become conditional
+            # expectations
+            realized_payouts = payouts
+            payouts, control_values = reduction.adjust(total_points, ranking, payouts, ranks, weights)
+    with profiler.stage('accumulate'):
+        accumulator.update(total_points, payouts, ranks, weights, control_values, realized_payouts)
+    return accumulator
+
+# Worker process state, set once per process by the pool initializer so the model is not re-sent with every batch
+_worker_state = {}
+
+def _init_worker(model, payout_table, pods, accumulator, profile, reduction):
+    _worker_state['model'] = model
+    _worker_state['payout_table'] = payout_table
+    _worker_state['pods'] = pods
+    _worker_state['accumulator'] = accumulator
+    _worker_state['profile'] = profile
+    _worker_state['reduction'] = reduction
+
+# Returns the batch accumulator and, when profiling, a profiler holding this batch's stage timings
+def _simulate_worker_batch(task):
+    batch_size, rng = task
+    accumulator = _worker_state['accumulator'].empty_like(deferred=True)
+    profiler = SimulationProfiler() if _worker_state['profile'] else NULL_PROFILER
+    simulate_batch(_worker_state['model'], _worker_state['payout_table'], batch_size, accumulator, rng, _worker_state['pods'], profiler,
+                   _worker_state['reduction'])
+    return accumulator, profiler if profiler.enabled else None
+
+# Counter-based random streams. Simulation k reads a Philox stream keyed by the seed with counter word 1 set to k,
+# so every sim draws the same normals however sims are batched and whichever worker runs them. Drop-in for
+# np.random / Generator in the models, which only call normal(size=...) with sims on the first axis.
+# With antithetic=True sims 2m and 2m + 1 both read stream m, the odd sim negated
+class SimulationStreams:
+    def __init__(self, seed, start=0, antithetic=False):
+        self.key = np.random.SeedSequence(seed).generate_state(2, np.uint64)
+        self.start = start
+        self.antithetic = antithetic
+        self._generator = None
+
+    def __getstate__(self):
+        return {'key': self.key, 'start': self.start, 'antithetic': self.antithetic, '_generator': None}
+
+    def normal(self, size):
+        if self._generator is None:
+            self._generator = np.random.Generator(np.random.Philox(key=self.key))
+        bit_generator = self._generator.bit_generator
+        state = bit_generator.state
+        normals = np.empty(size)
+        for row in range(size[0]):
+            sim = self.start + row
+            if self.antithetic and sim % 2 == 1 and row > 0:
+                np.negative(normals[row - 1], out=normals[row])
+                continue
+            # Reset to the start of this sim's counter block and drop any buffered output from the previous sim
+            state['state']['counter'][:] = (0, sim // 2 if self.antithetic else sim, 0, 0)
+            state['buffer_pos'] = 4
+            state['has_uint32'] = 0
+            state['uinteger'] = 0
+            bit_generator.state = state
+            self._generator.standard_normal(out=normals[row])
+            if self.antithetic and sim % 2 == 1:
+                np.negative(normals[row], out=normals[row])
+        self.start += size[0]
+        return normals
+
+# Function to pick a batch size that keeps a roster-mode batch near four million player slots, about 32MB per
+# (sims x teams x slots) float64 array, in whole merge blocks of at most 256 sims
+def default_batch_size(num_teams):
+    return max(MERGE_BLOCK, min(256, 4_000_000 // (max(num_teams, 1) * 6)))
+
+# Function to split sims [start, num_simulations) into batches, each reading the counter-based streams of its own
+# sims. batch_size is rounded up to whole accumulator merge blocks, so results depend only on the seed, not on the
+# batch size or worker count
+def plan_simulation_batches(num_simulations, batch_size, seed, start=0, antithetic=False):
+    batch_size = -(-batch_size // MERGE_BLOCK) * MERGE_BLOCK
+    return [(min(batch_size, num_simulations - first), SimulationStreams(seed, first, antithetic)) for first in range(start, num_simulations, batch_size)]
+
+# Function to create an empty accumulator whose points histogram spans each team's mean +/- 6 standard deviations,
+# weighted, keeping control sums and realized payouts as a variance-reduction plan needs
+def create_accumulator(model, top_n=10, histogram_bins=128, reduction=None):
+    mean, std_dev = model.total_moments()
+    return OutcomeAccumulator(len(mean), mean - 6 * std_dev, mean + 6 * std_dev, histogram_bins, top_n,
+                              weighted=reduction is not None and reduction.weighted,
+                              control_means=None if reduction is None else reduction.control_means,
+                              conditional=reduction is not None and reduction.conditional is not None)
+
+# Function to yield one (accumulator, worker profiler or None) pair per seeded batch in plan order, in-process or
+# across a process pool
+def run_simulation_batches(model, payout_table, pods, accumulator, tasks, workers, profiler=NULL_PROFILER, reduction=None):
+    if workers == 1:
+        for num_batch, rng in tasks:
+            yield simulate_batch(model, payout_table, num_batch, accumulator.empty_like(deferred=True), rng, pods, profiler, reduction), None
+        return
+    initargs = (model, payout_table, pods, accumulator, profiler.enabled, reduction)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        # Batches are yielded in submission order, so the merge is the same for any worker count. Only a few
+        # batches per worker are in flight, so a caller that stops early leaves little work behind
+        pending = deque()
+        try:
+            for task in tasks:
+                pending.append(executor.submit(_simulate_worker_batch, task))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+# Function to simulate team outcomes from draft results into a streaming OutcomeAccumulator. With workers=1 and no
+# seed the sims use the global np.random state; otherwise every sim reads its own counter-based Philox stream
+# derived from seed, and batches run across a process pool. by_pod=True ranks and pays each Simulation pod
+# separately instead of the whole field.
+# With checkpoint_path the accumulator, sim counter and seed are saved every checkpoint_every batches and at the
+# end; if the file already exists the run resumes from it and matches an uninterrupted run.
+# Pass a SimulationProfiler as profiler to collect stage timings, counters and progress callbacks, and a
+# VarianceReduction as variance_reduction for antithetic draws, conditional payouts, control variates or importance
+# sampling. With a stopping.StoppingRule as stopping, num_simulations is a cap and the run ends once the rule's
+# precision, top-N stability or time target is met. batch_size=None scales the batch to the field, see default_batch_size
+def simulate_team_outcomes(draft_results, projection_lookup, num_simulations, batch_size=None, factor_cache=None, correlation='roster', workers=1, seed=None, payout_table=None, by_pod=False, top_n=10, histogram_bins=128, checkpoint_path=None, checkpoint_every=64, profiler=None, variance_reduction=None, stopping=None):
+    pods = draft_results.pods if by_pod else None
+    if profiler is None:
+        profiler = NULL_PROFILER
+    if factor_cache is None:
+        factor_cache = FactorCache()
+
+    registry = as_player_registry(projection_lookup)
+    draft_results = index_draft_results(draft_results, registry)
+    with profiler.stage('build_model'):
+        model = build_simulation_model(draft_results, registry, correlation, factor_cache)
+    profiler.count('factor_cache_hits', factor_cache.hits)
+    profiler.count('factor_cache_misses', factor_cache.misses)
+    if payout_table is None:
+        payout_table = DEFAULT_PAYOUTS
+    reduction = None
+    if variance_reduction is not None:
+        reduction = variance_reduction.prepare(model, payout_table, pods, top_n)
+    accumulator = create_accumulator(model, top_n, histogram_bins, reduction)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = default_batch_size(len(draft_results.teams))
+    if stopping is not None:
+        stopping.start()
+
+    if workers == 1 and seed is None and checkpoint_path is None and variance_reduction is None:
+        # Simulations are drawn in batches so memory stays bounded at batch_size x teams x players
+        for start in range(0, num_simulations, batch_size):
+            num_batch = min(batch_size, num_simulations - start)
+            simulate_batch(model, payout_table, num_batch, accumulator, pods=pods, profiler=profiler)
+            profiler.record_batch(num_batch, start + num_batch, num_simulations)
+            if stopping is not None and stopping.should_stop(accumulator):
+                break
+        return accumulator
+
+    # Everything the accumulated results depend on besides the seed, so a checkpoint only resumes the same run
+    config = {'num_teams': len(draft_results.teams), 'num_simulations': num_simulations, 'correlation': correlation, 'by_pod': by_pod,
+              'variance_reduction': repr(variance_reduction), 'top_n': top_n, 'histogram_bins': histogram_bins,
+              'field': field_version(draft_results), 'projections': projection_version(registry, draft_results.player_ids),
+              'payouts': payout_version(payout_table)}
+    completed_sims = 0
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        completed_sims, saved_seed, saved_config, accumulator = load_checkpoint(checkpoint_path)
+        if saved_config != config:
+            changed = sorted(name for name in config.keys() | saved_config.keys() if config.get(name) != saved_config.get(name))
+            raise ValueError(f"Checkpoint {checkpoint_path} was written for a different run, changed: {', '.join(changed)}")
+        if seed is not None and encode_seed(seed) != encode_seed(saved_seed):
+            raise ValueError(f"Checkpoint {checkpoint_path} was written with seed {saved_seed}, not {seed}")
+        seed = saved_seed
+    elif seed is None:
+        # A checkpointed run needs a seed it can record, draw one from OS entropy
+        seed = np.random.SeedSequence().entropy
+    elif checkpoint_path is not None:
+        # Fail before simulating if the seed cannot be recorded
+        encode_seed(seed)
+
+    antithetic = variance_reduction is not None and variance_reduction.antithetic
+    tasks = plan_simulation_batches(num_simulations, batch_size, seed, completed_sims, antithetic)
+    batch_results = run_simulation_batches(model, payout_table, pods, accumulator, tasks, workers, profiler, reduction)
+    for batch_index, (num_batch, _) in enumerate(tasks, 1):
+        batch_accumulator, batch_profiler = next(batch_results)
+        with profiler.stage('merge'):
+            accumulator.merge(batch_accumulator)
+        profiler.merge(batch_profiler)
+        completed_sims += num_batch
+        profiler.record_batch(num_batch, completed_sims, num_simulations)
+        if checkpoint_path is not None and batch_index % checkpoint_every == 0:
+            with profiler.stage('checkpoint'):
+                save_checkpoint(checkpoint_path, accumulator, completed_sims, seed, config)
+        if stopping is not None and stopping.should_stop(accumulator):
+            batch_results.close()
+            break
+
+    if checkpoint_path is not None:
+        with profiler.stage('checkpoint'):
+            save_checkpoint(checkpoint_path, accumulator, completed_sims, seed, config)
+    return accumulator
+
+# Function to simulate team projections from draft results, returns the average payout per team
+def simulate_team_projections(draft_results, projection_lookup, num_simulations, **kwargs):
+    return simulate_team_outcomes(draft_results, projection_lookup, num_simulations, **kwargs).average_payout
+
+# Function to run the full pipeline, workers=None uses every available core. A given seed reproduces the same
+# results on any number of workers; seed=None draws fresh entropy. Besides Average_Payout the results carry payout
+# SD and standard error, win/top-N/cash rates and total-points mean, SD and quantiles per team. draft_results_df may also be an already
+# prepared DraftResults, e.g. a stored field opened with field_store.load_field. With a StoppingRule num_simulations
+# is a cap; the sims actually run are in results.attrs['num_simulations'] either way, and the rank counted by
+# TopN_Rate is results.attrs['top_n']
+def run_parallel_simulations(num_simulations, draft_results_df, projection_lookup, correlation='roster', workers=None, seed=None, payout_table=None, by_pod=False, top_n=10, checkpoint_path=None, profiler=None, variance_reduction=None, stopping=None):
+    registry = as_player_registry(projection_lookup)
+    with (profiler or NULL_PROFILER).stage('prepare'):
+        if isinstance(draft_results_df, DraftResults):
+            draft_results = index_draft_results(draft_results_df, registry)
+        else:
+            draft_results = prepare_draft_results(draft_results_df, registry)
+    accumulator = simulate_team_outcomes(draft_results, registry, num_simulations, correlation=correlation, workers=workers, seed=seed, payout_table=payout_table, by_pod=by_pod, top_n=top_n, checkpoint_path=checkpoint_path, profiler=profiler, variance_reduction=variance_reduction, stopping=stopping)
+    return summarize_results(draft_results, accumulator)
+
+# Function to build the results table, one row per team with the accumulator's summary columns
+def summarize_results(draft_results, accumulator):
+    import pandas as pd
+    # Prepare final results
+    final_results = pd.DataFrame({
+        'Team': draft_results.teams,
+        **accumulator.summary()
+    })
+    final_results.attrs['num_simulations'] = accumulator.num_sims
+    final_results.attrs['top_n'] = accumulator.top_n
+    
+    return final_results
@@ -0,0 +1,58 @@
+import time
+import numpy as np
+from scipy.special import ndtri
+
+# Adaptive stopping rule for simulate_team_outcomes, whose num_simulations becomes the cap. After every merged batch
+# the run stops once one of the targets that are set is met:
+# half_width: every team's Average_Payout is within +/- half_width at the given confidence (normal interval on
+# Payout_SE), checked from min_simulations on;
+# top_n: the best top_n teams by Average_Payout kept the same order for stable_checks merged batches in a row,
+# also from min_simulations on;
+# time_budget: time_budget seconds have passed since the run started.
+# Sims keep their own seeded streams, so a run that stops after N sims matches a fixed run of N sims. After the run
+# num_simulations, reason ('precision', 'top_n', 'time_budget' or 'limit'), elapsed_seconds and max_half_width
+# describe how it ended
+class StoppingRule:
+    def __init__(self, half_width=None, confidence=0.95, top_n=None, stable_checks=4, time_budget=None, min_simulations=1024):
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be within (0, 1)")
+        self.half_width = half_width
+        self.confidence = confidence
+        self.top_n = top_n
+        self.stable_checks = stable_checks
+        self.time_budget = time_budget
+        self.min_simulations = min_simulations
+        self.start()
+
+    # Function to reset the clock and the run's outcome, called by simulate_team_outcomes before the first batch
+    def start(self):
+        self.started = time.perf_counter()
+        self.num_simulations = 0
+        self.reason = 'limit'
+        self.elapsed_seconds = 0.0
+        self.max_half_width = np.inf
+        self._top_order = None
+        self._stable = 0
+
+    # Function to check the targets against the accumulator after a merged batch, returns True to stop
+    def should_stop(self, accumulator):
+        self.num_simulations = accumulator.num_sims
+        self.elapsed_seconds = time.perf_counter() - self.started
+        self.max_half_width = float(ndtri((1 + self.confidence) / 2) * accumulator.payout_se.max())
+
+        if self.top_n is not None:
+            top_order = np.argsort(-accumulator.average_payout, kind='stable')[:self.top_n]
+            stable = self._top_order is not None and np.array_equal(top_order, self._top_order)
+            self._stable = self._stable + 1 if stable else 0
+            self._top_order = top_order
+
+        enough = accumulator.num_sims >= self.min_simulations
+        if enough and self.half_width is not None and self.max_half_width <= self.half_width:
+            self.reason = 'precision'
+        elif enough and self.top_n is not None and self._stable >= self.stable_checks:
+            self.reason = 'top_n'
+        elif self.time_budget is not None and self.elapsed_seconds >= self.time_budget:
+            self.reason = 'time_budget'
+        else:
+            return False
+        return True
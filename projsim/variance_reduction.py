@@ -0,0 +1,202 @@
+import numpy as np
+from scipy.special import logsumexp, ndtr
+
+# Variance-reduction options for a seeded simulation, see simulate_team_outcomes.
+# antithetic pairs every even sim with the next one, which reads the same normals negated.
+# conditional replaces each team's realized payout by its expectation over the team's own total given every other
+# team's total in the sim (conditional Monte Carlo). It needs the roster model, whose teams draw independently,
+# and removes most of the noise of rare top finishes; it cannot be combined with importance sampling.
+# control_variates regresses each team's payout on controls with known means: the team's standardized total and
+# hinges max(z - cut, 0) at the totals the team needs to reach ranks 1, top_n and the last paid rank of the
+# deterministic projection ranking (plus the importance weight itself when sampling is weighted).
+# importance_shift > 0 draws a share 1 - nominal_share of the sims from a tail-focused mixture: one team, chosen
+# uniformly, has its total shifted up by importance_shift standard deviations. Every sim is reweighted by the
+# likelihood ratio of the nominal density to the whole mixture, so estimates stay unbiased
+class VarianceReduction:
+    def __init__(self, antithetic=False, conditional=False, control_variates=False, importance_shift=0.0, nominal_share=0.5):
+        if importance_shift < 0 or not 0 <= nominal_share <= 1:
+            raise ValueError("importance_shift must be >= 0 and nominal_share within [0, 1]")
+        if conditional and importance_shift > 0:
+            raise ValueError("Conditional payouts cannot be combined with importance sampling")
+        self.antithetic = antithetic
+        self.conditional = conditional
+        self.control_variates = control_variates
+        self.importance_shift = importance_shift
+        self.nominal_share = nominal_share
+
+    def __repr__(self):
+        return (f"VarianceReduction(antithetic={self.antithetic}, conditional={self.conditional}, control_variates={self.control_variates}, "
+                f"importance_shift={self.importance_shift}, nominal_share={self.nominal_share})")
+
+    # Function to build the sampler, conditional payouts and projection controls for one model
+    def prepare(self, model, payout_table, pods=None, top_n=10):
+        mean, std_dev = model.total_moments()
+        sampler = conditional = controls = None
+        if self.importance_shift > 0:
+            sampler = ImportanceSampler(model.total_directions(), model.blockwise_normals, self.importance_shift, self.nominal_share)
+        if self.conditional:
+            if not model.blockwise_normals:
+                raise ValueError("Conditional payouts need the 'roster' correlation mode, whose teams draw independently")
+            conditional = ConditionalPayouts(mean, std_dev, payout_table)
+        if self.control_variates:
+            groups = np.zeros(len(mean), dtype=np.int64) if pods is None else pods
+            ranks = sorted({1, top_n, max(payout_table.last_paid_rank, 1)})
+            controls = ProjectionControls(mean, std_dev, projected_cutoffs(mean, groups, ranks), sampler is not None)
+        return ReductionPlan(sampler, conditional, controls)
+
+# The prepared pieces of a VarianceReduction for one model, each None when not in use. Passed to simulate_batch
+# and settle_batch, and sent to worker processes once
+class ReductionPlan:
+    def __init__(self, sampler, conditional, controls):
+        self.sampler = sampler
+        self.conditional = conditional
+        self.controls = controls
+
+    @property
+    def weighted(self):
+        return self.sampler is not None
+
+    @property
+    def control_means(self):
+        return None if self.controls is None else self.controls.means
+
+    # Function to wrap an RNG for the importance sampler, if any
+    def wrap_rng(self, rng):
+        return rng if self.sampler is None else self.sampler.wrap_rng(rng)
+
+    # Function to turn a settled batch into what the accumulator takes: the payouts, conditional when enabled,
+    # and the weighted control values (None without controls)
+    def adjust(self, total_points, ranking, payouts, ranks, weights=None):
+        if self.conditional is not None:
+            payouts = self.conditional.expected(total_points, ranking, ranks)
+        controls = None if self.controls is None else self.controls.values(total_points, weights)
+        return payouts, controls
+
+# Conditional expected payouts. Given the other teams' totals, a team finishes k-th or better exactly when its total
+# beats the k-th best of the others, so its expected payout is the sum over the payout drops (k, pay(k) - pay(k + 1))
+# of the drop times P(total > k-th best other). Totals are normal with the model's mean and standard deviation, and
+# the drops are the few tier boundaries of the payout table
+class ConditionalPayouts:
+    def __init__(self, mean, std_dev, payout_table):
+        self.drop_ranks, self.drops = payout_table.drops()
+        self.mean = mean
+        self.std_dev = np.maximum(std_dev, 1e-12)
+
+    # Largest rank whose total must be known, which rank() must cover
+    @property
+    def depth(self):
+        return int(self.drop_ranks[-1]) + 1 if len(self.drop_ranks) else 1
+
+    # Function to compute every team's expected payout over its own total, from a ranking returned by
+    # PayoutTable.rank and the finishing ranks returned by PayoutTable.pay
+    def expected(self, total_points, ranking, ranks):
+        order, _, sorted_pods = ranking
+        sorted_points = np.take_along_axis(total_points, order, axis=1)
+        if sorted_pods is None:
+            group_starts = np.zeros(1, dtype=np.int64)
+            group_sizes = np.full(1, sorted_points.shape[1])
+            team_groups = np.zeros(total_points.shape[1], dtype=np.int64)
+        else:
+            group_sizes = np.bincount(sorted_pods)
+            group_starts = np.cumsum(group_sizes) - group_sizes
+            # Every sim lays the pods out the same way, so the first sim's order gives each team's pod
+            team_groups = np.empty(total_points.shape[1], dtype=np.int64)
+            team_groups[order[0]] = sorted_pods
+        expected = np.zeros(total_points.shape)
+        for rank, drop in zip(self.drop_ranks, self.drops):
+            # The k-th best other team is the k-th best overall, or the (k + 1)-th for teams that finished k-th or better
+            kth = self.group_values(sorted_points, group_starts, group_sizes, rank - 1)
+            next_kth = self.group_values(sorted_points, group_starts, group_sizes, rank)
+            cut = np.where(ranks <= rank, next_kth[:, team_groups], kth[:, team_groups])
+            expected += drop * ndtr((self.mean - cut) / self.std_dev)
+        return expected
+
+    # Function to gather the total at 0-based position within each group of the sorted points, -inf past the group
+    @staticmethod
+    def group_values(sorted_points, group_starts, group_sizes, position):
+        values = sorted_points[:, np.minimum(group_starts + position, sorted_points.shape[1] - 1)]
+        return np.where(position < group_sizes, values, -np.inf)
+
+# Function to find, per team, the projected total of the team at each rank of the deterministic projection
+# ranking of its group (pod or whole field), ranks past the group size clamp to its last team
+def projected_cutoffs(mean, groups, ranks):
+    order = np.lexsort((-mean, groups))
+    sorted_groups = groups[order]
+    group_starts = np.searchsorted(sorted_groups, groups, side='left')
+    group_sizes = np.bincount(groups)[groups]
+    cutoffs = np.empty((len(mean), len(ranks)))
+    for k, rank in enumerate(ranks):
+        cutoffs[:, k] = mean[order][group_starts + np.minimum(rank, group_sizes) - 1]
+    return cutoffs
+
+# Control variates built from each team's projected distribution. A team's total is exactly normal, so its
+# standardized total z and the hinges max(z - cut, 0) at its projected cutoffs have closed-form means
+class ProjectionControls:
+    def __init__(self, mean, std_dev, cutoffs, weighted):
+        self.mean = mean
+        self.std_dev = np.maximum(std_dev, 1e-12)
+        self.cut_z = (cutoffs - mean[:, None]) / self.std_dev[:, None]
+        hinge_means = np.exp(-self.cut_z ** 2 / 2) / np.sqrt(2 * np.pi) - self.cut_z * ndtr(-self.cut_z)
+        self.weighted = weighted
+        columns = [np.zeros((len(mean), 1)), hinge_means]
+        if weighted:
+            columns.append(np.ones((len(mean), 1)))
+        self.means = np.concatenate(columns, axis=1)
+
+    # Function to evaluate the controls on a batch of (sims x teams) total points, returns (sims x teams x controls)
+    # multiplied by the importance weights when given
+    def values(self, total_points, weights=None):
+        z = (total_points - self.mean) / self.std_dev
+        columns = [z[:, :, None], np.maximum(z[:, :, None] - self.cut_z, 0.0)]
+        if self.weighted:
+            columns.append(np.ones(z.shape + (1,)))
+        controls = np.concatenate(columns, axis=2)
+        if weights is not None:
+            controls *= weights[:, None, None]
+        return controls
+
+# Defensive mixture importance sampler over the models' standard normals. directions holds, per team, the gradient
+# of the team's total with respect to the normals, over that team's own block of normals when blockwise (roster
+# model) or over all of them (global model). Component t shifts the normals by importance_shift along team t's
+# direction, scaled to unit length, which raises that team's total by importance_shift standard deviations
+class ImportanceSampler:
+    def __init__(self, directions, blockwise, importance_shift, nominal_share):
+        norms = np.linalg.norm(directions.reshape(len(directions), -1), axis=1)
+        self.shifts = importance_shift * directions / np.maximum(norms, 1e-12).reshape((-1,) + (1,) * (directions.ndim - 1))
+        self.blockwise = blockwise
+        self.importance_shift = importance_shift
+        self.nominal_share = nominal_share
+
+    # Function to wrap an RNG so its normals come from the mixture, see ImportanceStreams
+    def wrap_rng(self, rng):
+        return ImportanceStreams(rng, self)
+
+    # Function to shift a batch of nominal normals to the mixture components picked by the uniforms, in place,
+    # and return the importance weight of every sim
+    def shift(self, normals, uniforms):
+        num_components = len(self.shifts)
+        component = np.minimum(((uniforms - self.nominal_share) / max(1 - self.nominal_share, 1e-12) * num_components).astype(np.int64), num_components - 1)
+        shifted = np.flatnonzero(uniforms >= self.nominal_share)
+        if self.blockwise:
+            normals[shifted, component[shifted]] += self.shifts[component[shifted]]
+            scores = np.einsum('btj,tj->bt', normals, self.shifts)
+        else:
+            normals[shifted] += self.shifts[component[shifted]]
+            scores = np.einsum('bj,tj->bt', normals, self.shifts)
+        log_mixture = np.logaddexp(np.log(self.nominal_share) if self.nominal_share > 0 else -np.inf,
+                                   np.log1p(-self.nominal_share) - np.log(num_components) + logsumexp(scores - self.importance_shift ** 2 / 2, axis=1))
+        return np.exp(-log_mixture)
+
+# RNG wrapper drawing from the importance mixture. Each sim reads one extra normal from its own stream to pick its
+# component, so sampling stays deterministic per sim. weights holds the importance weights of the last draw
+class ImportanceStreams:
+    def __init__(self, rng, sampler):
+        self.rng = rng
+        self.sampler = sampler
+        self.weights = None
+
+    def normal(self, size):
+        draws = self.rng.normal(size=(size[0], int(np.prod(size[1:])) + 1))
+        normals = draws[:, :-1].reshape(size)
+        self.weights = self.sampler.shift(normals, ndtr(draws[:, -1]))
+        return normals
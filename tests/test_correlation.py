@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from projsim.simulation import (
+    MIN_BLOCK_EIGENVALUE, as_player_registry, create_correlation_matrix, create_global_factor, prepare_draft_results, projections,
+    simulate_team_outcomes,
+)
+
+def test_global_factor_keeps_the_pair_rule_for_valid_blocks():
+    positions = np.array(['QB', 'WR', 'WR', 'TE', 'RB', 'QB', 'WR'])
+    teams = np.array([0, 0, 0, 0, 0, 1, 1])
+    factor = create_global_factor(positions, teams)
+    expected = np.zeros((7, 7))
+    for team in (0, 1):
+        block = np.flatnonzero(teams == team)
+        expected[np.ix_(block, block)] = create_correlation_matrix(teams[block], positions[block])
+    np.testing.assert_allclose(factor @ factor.T, expected, atol=1e-12)
+
+# A QB with eight WRs, a TE and two RBs on one NFL team has no valid pairwise correlation matrix
+def test_global_factor_shrinks_a_deep_nfl_team_block():
+    positions = np.array(['QB'] + ['WR'] * 8 + ['TE', 'RB', 'RB'])
+    teams = np.zeros(len(positions), dtype=np.int64)
+    factor = create_global_factor(positions, teams)
+    correlation = factor @ factor.T
+    np.testing.assert_allclose(np.diag(correlation), 1.0)
+    assert np.linalg.eigvalsh(correlation)[0] >= MIN_BLOCK_EIGENVALUE - 1e-12
+    # Shrinking scales every correlation by the same factor, so their order and signs are kept
+    pair_rule = create_correlation_matrix(teams, positions)
+    scale = correlation[0, 1] / pair_rule[0, 1]
+    assert 0 < scale < 1
+    np.testing.assert_allclose(correlation - np.identity(len(positions)), scale * (pair_rule - np.identity(len(positions))), atol=1e-12)
+
+def test_global_mode_runs_on_a_field_stacking_one_nfl_team():
+    registry = as_player_registry(projections)
+    names = registry.names[:12]
+    columns = {'Simulation': [1, 1], 'Team': ['Team 1', 'Team 2']}
+    for slot in range(6):
+        columns[f'Player_{slot + 1}_Name'] = [names[slot], names[slot + 6]]
+        columns[f'Player_{slot + 1}_Position'] = ['QB' if slot == 0 else 'WR', 'WR']
+        columns[f'Player_{slot + 1}_Team'] = ['DAL', 'DAL']
+    draft_results = prepare_draft_results(pd.DataFrame(columns), registry)
+    accumulator = simulate_team_outcomes(draft_results, registry, 128, correlation='global', seed=0)
+    assert np.isfinite(accumulator.summary()['Points_SD']).all()
@@ -0,0 +1,134 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from projsim.evaluator import FieldEvaluator
+from projsim.incremental import IncrementalSimulation
+from projsim.instrumentation import SimulationProfiler
+from projsim.payouts import DEFAULT_PAYOUTS, PayoutTable, top_k_order
+from projsim.simulation import PlayerRegistry, as_player_registry, prepare_draft_results, projections, simulate_team_outcomes
+from projsim.variance_reduction import VarianceReduction
+
+BUNDLED_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'draft_results_with_team_stacking_and_positions (3).csv')
+
+# The first 100 pods of the bundled field
+@pytest.fixture(scope='module')
+def field():
+    registry = as_player_registry(projections)
+    return prepare_draft_results(pd.read_csv(BUNDLED_CSV).head(600), registry), registry
+
+def assert_same_results(accumulator, expected):
+    summary, expected_summary = accumulator.summary(), expected.summary()
+    assert summary.keys() == expected_summary.keys()
+    for name in summary:
+        np.testing.assert_array_equal(summary[name], expected_summary[name], err_msg=name)
+
+@pytest.mark.parametrize('correlation, variance_reduction', [
+    ('roster', None),
+    ('global', None),
+    ('roster', VarianceReduction(antithetic=True, control_variates=True, importance_shift=1.5)),
+    ('global', VarianceReduction(importance_shift=1.5)),
+    ('roster', VarianceReduction(conditional=True)),
+])
+def test_results_do_not_depend_on_batch_size_or_workers(field, correlation, variance_reduction):
+    draft_results, registry = field
+    run = {'correlation': correlation, 'variance_reduction': variance_reduction, 'seed': 42}
+    expected = simulate_team_outcomes(draft_results, registry, 300, batch_size=256, workers=1, **run)
+    for batch_size, workers in ((100, 1), (37, 2)):
+        accumulator = simulate_team_outcomes(draft_results, registry, 300, batch_size=batch_size, workers=workers, **run)
+        assert_same_results(accumulator, expected)
+
+class Interrupt(Exception):
+    pass
+
+def test_resumed_checkpoint_matches_uninterrupted_run(field, tmp_path):
+    draft_results, registry = field
+    checkpoint_path = str(tmp_path / 'run.npz')
+    expected = simulate_team_outcomes(draft_results, registry, 640, batch_size=128, seed=[3, 2 ** 70])
+
+    def interrupt(sims_done, num_simulations):
+        if sims_done >= 256:
+            raise Interrupt
+
+    with pytest.raises(Interrupt):
+        simulate_team_outcomes(draft_results, registry, 640, batch_size=128, seed=[3, 2 ** 70], checkpoint_path=checkpoint_path,
+                               checkpoint_every=1, profiler=SimulationProfiler(interrupt))
+    doubled = PlayerRegistry(registry.names, registry.proj * 2, registry.projsd)
+    for changes in ({'projection_lookup': doubled}, {'payout_table': PayoutTable.from_dict({1: 5.0})}, {'top_n': 3}, {'seed': 4}):
+        run = {'draft_results': draft_results, 'projection_lookup': registry, 'num_simulations': 640, 'batch_size': 128,
+               'checkpoint_path': checkpoint_path, **changes}
+        with pytest.raises(ValueError):
+            simulate_team_outcomes(**run)
+
+    # The batch size is free to change on resume
+    resumed = simulate_team_outcomes(draft_results, registry, 640, batch_size=64, checkpoint_path=checkpoint_path)
+    assert_same_results(resumed, expected)
+
+def test_weighted_checkpoint_resumes_with_another_batch_size(field, tmp_path):
+    draft_results, registry = field
+    checkpoint_path = str(tmp_path / 'run.npz')
+    run = {'seed': 1, 'variance_reduction': VarianceReduction(importance_shift=1.5)}
+    expected = simulate_team_outcomes(draft_results, registry, 640, batch_size=128, **run)
+
+    def interrupt(sims_done, num_simulations):
+        if sims_done >= 256:
+            raise Interrupt
+
+    with pytest.raises(Interrupt):
+        simulate_team_outcomes(draft_results, registry, 640, batch_size=128, checkpoint_path=checkpoint_path, checkpoint_every=1,
+                               profiler=SimulationProfiler(interrupt), **run)
+    resumed = simulate_team_outcomes(draft_results, registry, 640, batch_size=64, checkpoint_path=checkpoint_path, **run)
+    assert_same_results(resumed, expected)
+
+# Payout_SD stays the spread of realized payouts when the averaged payouts are conditional expectations
+def test_conditional_payout_sd_describes_realized_payouts(field):
+    draft_results, registry = field
+    plain = simulate_team_outcomes(draft_results, registry, 640, seed=7)
+    conditional = simulate_team_outcomes(draft_results, registry, 640, seed=7, variance_reduction=VarianceReduction(conditional=True))
+    np.testing.assert_array_equal(conditional.payout_std, plain.payout_std)
+    np.testing.assert_array_equal(conditional.cash_rate, plain.cash_rate)
+
+@pytest.mark.parametrize('k', [1, 5, 40, 199, 200])
+def test_top_k_order_matches_stable_sort_under_ties(k):
+    total_points = np.random.default_rng(k).integers(0, 12, size=(64, 200)).astype(np.float64)
+    full_order = np.argsort(-total_points, axis=1, kind='stable')
+    order = top_k_order(total_points, k)
+    # Every sim's order matches the full sort through the whole tie group holding its k-th best total
+    kth_best = np.sort(total_points, axis=1)[:, -k]
+    for sim, covered in enumerate((total_points >= kth_best[:, None]).sum(axis=1)):
+        np.testing.assert_array_equal(order[sim, :covered], full_order[sim, :covered])
+
+    # so paying a partial ranking splits ties exactly as paying the full one
+    payouts = PayoutTable.from_dict({1: 100.0, 2: 50.0, (3, max(k, 3)): 10.0})
+    order = top_k_order(total_points, max(k, 3))
+    np.testing.assert_array_equal(payouts.pay(total_points, (order, np.arange(1, order.shape[1] + 1), None)),
+                                  payouts.pay(total_points, (full_order, np.arange(1, 201), None)))
+
+def test_incremental_global_update_is_bit_identical(field):
+    draft_results, registry = field
+    simulation = IncrementalSimulation(draft_results, registry, 300, correlation='global', seed=5)
+    changes = {'Christian McCaffrey': {'proj': 12.0}, 'CeeDee Lamb': (31.0, 4.0)}
+    simulation.update(changes)
+
+    proj, projsd = registry.proj.copy(), registry.projsd.copy()
+    proj[registry.index['Christian McCaffrey']] = 12.0
+    proj[registry.index['CeeDee Lamb']], projsd[registry.index['CeeDee Lamb']] = 31.0, 4.0
+    expected = simulate_team_outcomes(draft_results, PlayerRegistry(registry.names, proj, projsd), 300, correlation='global', seed=5)
+    assert_same_results(simulation.accumulator, expected)
+
+def test_evaluator_matches_field_with_candidate_appended(field):
+    draft_results, registry = field
+    evaluator = FieldEvaluator(300, 'global', seed=3).load(draft_results, registry)
+    rostered = registry.names[evaluator.model.rostered]
+    candidates = [list(registry.names[draft_results.player_ids[i]]) for i in range(3)]
+    candidates += [list(np.random.default_rng(i).choice(rostered, 6, replace=False)) for i in range(3)]
+    scores = evaluator.score(candidates)
+
+    # The evaluator gives ties to the field team, as ranking by sort order with the candidate last does
+    rank_payouts = PayoutTable(DEFAULT_PAYOUTS.min_ranks, DEFAULT_PAYOUTS.max_ranks, DEFAULT_PAYOUTS.amounts, ties='rank')
+    field_points = evaluator.model.totals_from_units(evaluator.units, np.arange(len(draft_results.teams)))
+    for c, roster in enumerate(candidates):
+        index = np.searchsorted(evaluator.model.rostered, registry.ids(roster))
+        candidate_points = (evaluator.model.means[index] + evaluator.units[:, index] * evaluator.model.std_dev[index]).sum(axis=1)
+        payouts = rank_payouts.apply(np.concatenate([field_points, candidate_points[:, None]], axis=1))
+        assert payouts[:, -1].mean() == pytest.approx(scores['Average_Payout'][c], rel=1e-12, abs=1e-12)